@@ -1,9 +1,16 @@
+import os
 from flask import Flask
+from config.database import ensure_schema
+from utils.job_queue import start_workers
+from utils.warmup_utils import WARMUP_ON_START, start_warmup
 
 # Blueprints
 from routes.course_route import course_bp  # /course
 from routes.submission_route import submission_bp  # /submission
 from routes.plagiarism_route import plagiarism_bp  # /plagiarism
+from routes.job_route import job_bp  # /processing_status
+from routes.index_route import index_bp  # /index_info
+from routes.health_route import health_bp  # /health, /ready, /warmup
 
 # Flask app
 app = Flask(__name__)
@@ -12,6 +19,18 @@ app = Flask(__name__)
 app.register_blueprint(course_bp)
 app.register_blueprint(submission_bp)
 app.register_blueprint(plagiarism_bp)
+app.register_blueprint(job_bp)
+app.register_blueprint(index_bp)
+app.register_blueprint(health_bp)
+
+ensure_schema()
+
+# Background ingestion workers and model warm-up; skip the debug reloader's
+# watcher process. Models load in the background; /ready reports when they are in
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    start_workers()
+    if WARMUP_ON_START:
+        start_warmup()
 
 # Run server
 if __name__ == "__main__":
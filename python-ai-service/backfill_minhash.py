@@ -0,0 +1,68 @@
+import sys
+import sqlite3
+from config.database import DB_PATH, ensure_schema
+from utils.shingle_utils import shingle_hashes, encode_shingles
+from utils.minhash_utils import minhash_of, encode_signature, lsh_rows
+
+
+# One-shot fill of chunks.shingles, chunks.minhash and chunk_lsh for chunks
+# ingested before the fingerprint columns existed, or fingerprinted before the
+# shingles were built from normalize_text. --rebuild recomputes every chunk,
+# e.g. after the MinHash constants changed.
+# Usage: python backfill_minhash.py [--rebuild]
+def backfill_minhash(rebuild=False, batch_size=1000):
+    ensure_schema()
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        if rebuild:
+            cursor.execute("DELETE FROM chunk_lsh")
+            cursor.execute("UPDATE chunks SET minhash = NULL, shingles = NULL")
+            conn.commit()
+        # chunks shorter than one shingle get empty shingles and no signature
+        cursor.execute(
+            "SELECT id FROM chunks WHERE shingles IS NULL AND text IS NOT NULL "
+            "AND faissId IS NOT NULL ORDER BY id"
+        )
+        chunk_ids = [r[0] for r in cursor.fetchall()]
+
+        for start in range(0, len(chunk_ids), batch_size):
+            batch = chunk_ids[start : start + batch_size]
+            placeholders = ",".join(["?"] * len(batch))
+            cursor.execute(
+                f"SELECT id, faissId, text FROM chunks WHERE id IN ({placeholders})",
+                batch,
+            )
+            rows = []
+            for cid, fid, text in cursor.fetchall():
+                hashes = shingle_hashes(text)
+                rows.append((cid, fid, hashes, minhash_of(hashes)))
+            cursor.executemany(
+                "UPDATE chunks SET shingles = ?, minhash = ? WHERE id = ?",
+                [
+                    (encode_shingles(hashes), encode_signature(sig), cid)
+                    for cid, _, hashes, sig in rows
+                ],
+            )
+            # buckets of an earlier signature of the same chunk
+            cursor.executemany(
+                "DELETE FROM chunk_lsh WHERE faissId = ?",
+                [(fid,) for _, fid, _, _ in rows],
+            )
+            cursor.executemany(
+                "INSERT INTO chunk_lsh (band, bucket, faissId) VALUES (?, ?, ?)",
+                [r for _, fid, _, sig in rows for r in lsh_rows(fid, sig)],
+            )
+            conn.commit()
+            done = min(start + batch_size, len(chunk_ids))
+            print(f"Backfilled {done}/{len(chunk_ids)} chunks")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    backfill_minhash(rebuild="--rebuild" in sys.argv[1:])
@@ -0,0 +1,50 @@
+import sqlite3
+import faiss
+from config.database import DB_PATH, ensure_schema
+from utils.embedding_utils import encode_embedding
+from utils.embedding_batcher import embed_texts
+
+
+# One-shot fill of chunks.queryEmbedding for chunks ingested before the column
+# existed, so QUERY_EMBEDDING_MODE=stored scans never fall back to the model.
+# Usage: python backfill_query_embeddings.py
+def backfill_query_embeddings(batch_size=256):
+    ensure_schema()
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "SELECT id FROM chunks WHERE queryEmbedding IS NULL AND text IS NOT NULL "
+            "ORDER BY id"
+        )
+        chunk_ids = [r[0] for r in cursor.fetchall()]
+
+        for start in range(0, len(chunk_ids), batch_size):
+            batch = chunk_ids[start : start + batch_size]
+            placeholders = ",".join(["?"] * len(batch))
+            cursor.execute(
+                f"SELECT id, text FROM chunks WHERE id IN ({placeholders})", batch
+            )
+            rows = cursor.fetchall()
+            embeddings = embed_texts([f"query: {text}" for _, text in rows])
+            faiss.normalize_L2(embeddings)
+            cursor.executemany(
+                "UPDATE chunks SET queryEmbedding = ? WHERE id = ?",
+                [
+                    (encode_embedding(emb), cid)
+                    for (cid, _), emb in zip(rows, embeddings)
+                ],
+            )
+            conn.commit()
+            done = min(start + batch_size, len(chunk_ids))
+            print(f"Backfilled {done}/{len(chunk_ids)} chunks")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    backfill_query_embeddings()
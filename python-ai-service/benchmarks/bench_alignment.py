@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config.database import DB_PATH
+from utils.alignment_utils import align_snippets
+from utils.text_utils import normalize_text
+
+# Cost and agreement of the exact-copy check: SequenceMatcher.ratio() per pair
+# (the old check) against align_snippets over all snippets of a chunk at once.
+# Usage: python benchmarks/bench_alignment.py [num_chunks] [snippets_per_chunk]
+# Snippets are other stored chunks plus, for every chunk, an edited copy of it
+# (a sentence prepended, one word dropped) that the check must flag.
+exact_threshold = 0.90
+
+
+def edited_copy(text, rng):
+    words = text.split()
+    if len(words) > 10:
+        del words[rng.randrange(len(words))]
+    return "As stated in the source material, " + " ".join(words)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    per_chunk = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    texts = [
+        r[0]
+        for r in conn.execute("SELECT text FROM chunks WHERE text IS NOT NULL")
+    ]
+    conn.close()
+    if len(texts) < 2:
+        print("Need at least two chunks")
+        return
+    rng = random.Random(0)
+    chunks = texts[:count]
+    snippets = [
+        [edited_copy(c, rng)] + rng.sample(texts, min(per_chunk - 1, len(texts)))
+        for c in chunks
+    ]
+    pairs = sum(len(s) for s in snippets)
+
+    started = time.perf_counter()
+    old = [
+        [SequenceMatcher(None, normalize_text(c), normalize_text(s)).ratio() for s in ss]
+        for c, ss in zip(chunks, snippets)
+    ]
+    old_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    new = [align_snippets(c, ss) for c, ss in zip(chunks, snippets)]
+    new_seconds = time.perf_counter() - started
+
+    print(f"{len(chunks)} chunks, {pairs} pairs")
+    print(f"SequenceMatcher: {old_seconds:.3f}s ({old_seconds / pairs * 1e6:.0f} us/pair)")
+    print(f"align_snippets:  {new_seconds:.3f}s ({new_seconds / pairs * 1e6:.0f} us/pair)")
+    for name, scores in (
+        ("SequenceMatcher", [r[0] for r in old]),
+        ("align_snippets", [r[0][0] for r in new]),
+    ):
+        flagged = sum(1 for s in scores if s >= exact_threshold)
+        print(f"{name:<16} edited copies flagged at {exact_threshold}: {flagged}/{len(chunks)}")
+    spans = [len(r[0][1]) for r in new]
+    print(f"spans per edited copy: mean {sum(spans) / len(spans):.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.embedding import dimension
+from utils.faiss_utils import build_index, set_search_params
+from utils.vector_store import VectorStore
+
+# Recall@k and latency of the approximate layouts against the flat index.
+# Usage: python benchmarks/bench_ann_recall.py [num_vectors | vector_store_prefix]
+# A prefix such as ../faiss_submission benchmarks on the real stored embeddings;
+# otherwise clustered synthetic vectors stand in for chunk embeddings.
+k = 6
+num_queries = 500
+sweeps = {
+    "ivf_flat": [("nprobe", p) for p in (1, 4, 16, 64)],
+    "ivf_pq": [("nprobe", p) for p in (4, 16, 64)],
+    "hnsw": [("efSearch", e) for e in (16, 64, 256)],
+}
+
+
+def synthetic(n, num_topics=200, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((num_topics, dimension)).astype(np.float32)
+    labels = rng.integers(0, num_topics, n)
+    vectors = centers[labels] + 0.6 * rng.standard_normal((n, dimension)).astype(
+        np.float32
+    )
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def load(arg):
+    if os.path.exists(arg + ".ids"):
+        _, vectors = VectorStore(arg, dimension).all()
+        return vectors
+    return synthetic(int(arg))
+
+
+def timed_search(index, queries):
+    t0 = time.perf_counter()
+    _, I = index.search(queries, k)
+    return I, (time.perf_counter() - t0) * 1000 / len(queries)
+
+
+def recall(found, truth):
+    return np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+
+
+def main():
+    vectors = load(sys.argv[1] if len(sys.argv) > 1 else "50000")
+    ids = np.arange(len(vectors), dtype=np.int64)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), num_queries, replace=False)]
+    print(f"{len(vectors)} vectors, {num_queries} queries, k={k}")
+
+    flat = build_index("flat", vectors, ids)
+    truth, flat_ms = timed_search(flat, queries)
+    print(f"{'layout':<10} {'param':<14} {'recall@k':>9} {'ms/query':>9} {'build s':>8}")
+    print(f"{'flat':<10} {'-':<14} {1.0:>9.3f} {flat_ms:>9.3f} {'-':>8}")
+
+    for index_type, params in sweeps.items():
+        t0 = time.perf_counter()
+        index = build_index(index_type, vectors, ids)
+        build_s = time.perf_counter() - t0
+        for param, value in params:
+            if param == "nprobe":
+                set_search_params(index, nprobe=value)
+            else:
+                set_search_params(index, ef_search=value)
+            found, ms = timed_search(index, queries)
+            label = f"{param}={value}"
+            print(
+                f"{index_type:<10} {label:<14} {recall(found, truth):>9.3f} "
+                f"{ms:>9.3f} {build_s:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import resource
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.memory_cache import LRUCache
+
+# Soak test of the bounded in-process caches: every chunk of a long run of scans
+# is new, as on a busy server, so an unbounded dict would grow with every scan.
+# Usage: python benchmarks/bench_cache_memory.py [num_scans] [chunks_per_scan]
+# Keyword lists and 1024-d snippet embeddings are cached under the default
+# budgets; peak RSS should level off once the caches are full.
+dimension = 1024
+snippets_per_chunk = 9
+
+
+def rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    num_scans = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    chunks_per_scan = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    keywords = LRUCache("benchKeywords", 16)
+    embeddings = LRUCache("benchSnippetEmbeddings", 96)
+    rng = np.random.default_rng(0)
+    started = time.perf_counter()
+    for scan in range(num_scans):
+        for i in range(chunks_per_scan):
+            text = f"scan {scan} chunk {i} " + "lorem ipsum " * 40
+            keywords.put(f"25\n{text}", [f"keyword {k}" for k in range(25)])
+            for s in range(snippets_per_chunk):
+                row = rng.standard_normal(dimension).astype(np.float32)
+                embeddings.put(f"{text} snippet {s}", row)
+        if (scan + 1) % max(1, num_scans // 10) == 0:
+            print(
+                f"scan {scan + 1:>5}: rss {rss_mb():7.1f} MB, keywords "
+                f"{len(keywords)} ({keywords.bytes / 2**20:.1f} MB), embeddings "
+                f"{len(embeddings)} ({embeddings.bytes / 2**20:.1f} MB)"
+            )
+    seconds = time.perf_counter() - started
+    puts = num_scans * chunks_per_scan * (1 + snippets_per_chunk)
+    print(f"{puts} puts in {seconds:.2f}s ({seconds / puts * 1e6:.1f} us each)")
+    print("keywords:", keywords.stats())
+    print("embeddings:", embeddings.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from init_db import init_db
+from utils.db_utils import fetch_chunk_metadata
+
+# Neighbor hydration latency as the chunks table grows.
+# Usage: python benchmarks/bench_db_scan.py [max_rows]
+# A scan of a 500-chunk material hydrates ~3000 neighbor ids (top_k=5, two indexes).
+chunks_per_material = 50
+neighbors_per_scan = 3000
+repeats = 5
+
+
+def fill(cursor, start, end):
+    rng = np.random.default_rng(start)
+    for lo in range(start, end, 50_000):
+        hi = min(lo + 50_000, end)
+        first, last = lo // chunks_per_material, (hi - 1) // chunks_per_material
+        cursor.executemany(
+            """
+            INSERT OR IGNORE INTO materials (id, courseId, ownerType)
+            VALUES (?, ?, ?)
+            """,
+            [
+                (m + 1, f"course-{m % 40}", "courseMaterial")
+                for m in range(first, last + 1)
+            ],
+        )
+        cursor.executemany(
+            "INSERT INTO chunks (materialId, faissId, text) VALUES (?, ?, ?)",
+            [
+                (
+                    i // chunks_per_material + 1,
+                    i + 1,
+                    f"chunk {i} " * int(rng.integers(20, 60)),
+                )
+                for i in range(lo, hi)
+            ],
+        )
+
+
+def per_row_lookup(cursor, faiss_ids):
+    for faiss_id in faiss_ids:
+        cursor.execute(
+            "SELECT text, materialId FROM chunks WHERE faissId=?", (int(faiss_id),)
+        )
+        cursor.fetchone()
+
+
+def timed(fn, *args):
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    sizes = [n for n in (10_000, 100_000, 1_000_000, 5_000_000) if n <= max_rows]
+
+    db_path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    init_db(db_path)
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    rng = np.random.default_rng(0)
+
+    print(f"{'rows':>10} {'set-based (ms)':>15} {'per-row, indexed (ms)':>22}")
+    filled = 0
+    for size in sizes:
+        fill(cursor, filled, size)
+        conn.commit()
+        filled = size
+
+        ids = rng.choice(size, size=neighbors_per_scan, replace=False) + 1
+        set_ms = timed(fetch_chunk_metadata, cursor, ids)
+        row_ms = timed(per_row_lookup, cursor, ids)
+        print(f"{size:>10} {set_ms:>15.1f} {row_ms:>22.1f}")
+
+    conn.close()
+    os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import sqlite3
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config.database import DB_PATH
+from models.embedding import load_model, EMBEDDING_THREADS
+
+# Embedding throughput and parity of the inference backends, CPU only.
+# Usage: python benchmarks/bench_embedding_backends.py [num_chunks] [backend ...]
+# Chunks come from the chunks table (padded with synthetic text when it is small).
+# Each backend is compared to torch on the same inputs; the script exits 1 when
+# the cosine between a chunk's two embeddings drops below the bound.
+batch_size = 32
+min_cosine = {"onnx": 0.999, "onnx_int8": 0.97}
+mean_cosine = {"onnx": 0.9999, "onnx_int8": 0.99}
+
+
+def load_texts(count):
+    texts = []
+    try:
+        conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                "SELECT text FROM chunks WHERE text IS NOT NULL LIMIT ?", (count,)
+            ).fetchall()
+            texts = [r[0] for r in rows]
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        pass
+
+    rng = np.random.default_rng(0)
+    words = "bài tập thuật toán dữ liệu model training network course student".split()
+    while len(texts) < count:
+        texts.append(" ".join(rng.choice(words, size=80)))
+    return [f"passage: {t}" for t in texts[:count]]
+
+
+def encode(model, texts):
+    started = time.perf_counter()
+    embs = model.encode(
+        texts,
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+        normalize_embeddings=True,
+    ).astype(np.float32)
+    return embs, time.perf_counter() - started
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    backends = sys.argv[2:] or ["torch", "onnx", "onnx_int8"]
+    if "torch" not in backends:
+        backends = ["torch"] + backends
+    texts = load_texts(count)
+    print(
+        f"{len(texts)} chunks, batch {batch_size}, "
+        f"threads {EMBEDDING_THREADS or 'default'}, {os.cpu_count()} cores"
+    )
+
+    reference = None
+    ok = True
+    for backend in backends:
+        started = time.perf_counter()
+        model = load_model(backend)
+        load_seconds = time.perf_counter() - started
+        # the first batch pays for graph setup; keep it out of the throughput
+        encode(model, texts[:batch_size])
+        embs, seconds = encode(model, texts)
+
+        line = (
+            f"{backend:<10} load {load_seconds:6.1f}s  "
+            f"{len(texts) / seconds:7.1f} chunks/s"
+        )
+        if reference is None:
+            reference = embs
+        else:
+            cos = np.sum(embs * reference, axis=1)
+            line += f"  cosine vs torch min {cos.min():.5f} mean {cos.mean():.5f}"
+            if cos.min() < min_cosine[backend] or cos.mean() < mean_cosine[backend]:
+                line += "  [FAIL]"
+                ok = False
+        print(line)
+        del model
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
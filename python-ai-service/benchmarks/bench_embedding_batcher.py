@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.embedding import get_model
+from utils.embedding_batcher import EmbeddingBatcher
+
+# Texts/s under concurrent load: every thread calling model.encode on its own
+# small list (the old behaviour) against all threads sharing one batcher.
+# Usage: python benchmarks/bench_embedding_batcher.py [threads] [requests_per_thread]
+# Each thread mixes plagiarism-style calls (1 query, or 1-3 snippets) with an
+# occasional ingest-style call (20 chunks).
+rng = np.random.default_rng(0)
+words = "bài tập thuật toán dữ liệu model training network course student".split()
+
+
+def make_requests(count):
+    requests = []
+    for i in range(count):
+        size = 20 if i % 10 == 0 else int(rng.integers(1, 4))
+        requests.append(
+            [
+                "passage: " + " ".join(rng.choice(words, size=int(rng.integers(10, 90))))
+                for _ in range(size)
+            ]
+        )
+    return requests
+
+
+def run(num_threads, per_thread, encode):
+    workload = [make_requests(per_thread) for _ in range(num_threads)]
+    total = sum(len(r) for reqs in workload for r in reqs)
+
+    def worker(reqs):
+        for texts in reqs:
+            encode(texts)
+
+    threads = [threading.Thread(target=worker, args=(reqs,)) for reqs in workload]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return total / (time.perf_counter() - started)
+
+
+def main():
+    num_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    per_thread = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    model = get_model()
+    model.encode(["passage: warm up"], show_progress_bar=False)
+
+    direct = run(
+        num_threads,
+        per_thread,
+        lambda texts: model.encode(
+            texts, convert_to_numpy=True, show_progress_bar=False
+        ),
+    )
+    print(f"per-call model.encode  {direct:8.1f} texts/s")
+
+    for max_batch, max_wait_ms in [(32, 2), (64, 5), (128, 10)]:
+        batcher = EmbeddingBatcher(max_batch, max_wait_ms)
+        rate = run(num_threads, per_thread, batcher.encode)
+        stats = batcher.stats()
+        print(
+            f"batcher {max_batch:>3}/{max_wait_ms:>2}ms  {rate:8.1f} texts/s  "
+            f"({rate / direct:.2f}x, mean batch {stats['meanBatchSize']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import os
+import sys
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_ann_recall import k, num_queries, load, recall
+from utils.faiss_utils import FAISS_RERANK_FACTOR, build_index
+
+# Resident index size per million chunks for each storage layout, and recall@k
+# before/after exact re-ranking with the full-precision vectors.
+# Usage: python benchmarks/bench_index_memory.py [num_vectors | vector_store_prefix]
+# The memory-mapped vector store used for re-ranking adds 4 KB per chunk of page
+# cache, shared by every worker; it is not counted in the per-process figures.
+layouts = ["flat", "sqfp16", "sq8", "pq", "ivf_pq"]
+
+
+def rerank(vectors, queries, candidates):
+    found = []
+    for q, cand in zip(queries, candidates):
+        cand = cand[cand >= 0]
+        sims = vectors[cand] @ q
+        found.append(cand[np.argsort(-sims)[:k]])
+    return found
+
+
+def main():
+    vectors = load(sys.argv[1] if len(sys.argv) > 1 else "50000")
+    ids = np.arange(len(vectors), dtype=np.int64)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), num_queries, replace=False)]
+    _, truth = build_index("flat", vectors, ids).search(queries, k)
+    print(f"{len(vectors)} vectors, rerank factor {FAISS_RERANK_FACTOR}")
+
+    print(
+        f"{'layout':<8} {'bytes/vec':>10} {'MB / 1M chunks':>15} "
+        f"{'recall@k':>9} {'reranked':>9}"
+    )
+    for layout in layouts:
+        index = build_index(layout, vectors, ids)
+        per_vector = len(faiss.serialize_index(index)) / len(vectors)
+        _, raw = index.search(queries, k)
+        _, candidates = index.search(queries, k * FAISS_RERANK_FACTOR)
+        reranked = rerank(vectors, queries, candidates)
+        print(
+            f"{layout:<8} {per_vector:>10.0f} {per_vector * 1e6 / 2**20:>15.0f} "
+            f"{recall(raw, truth):>9.3f} {recall(reranked, truth):>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import sqlite3
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config.database import DB_PATH
+from utils.embedding_utils import decode_embedding
+from utils.plagiarism_utils import (
+    get_kw_model,
+    extract_keywords_batch,
+    keyword_cache,
+    candidate_embedding_cache,
+    stop_words_vi_en,
+)
+
+# Keyword time for one submission: KeyBERT per chunk (the old scan loop) against
+# the batched pass over every chunk, cold and with warm candidate embeddings.
+# Usage: python benchmarks/bench_keyword_batch.py [num_chunks] [top_n]
+# Chunks are read from database.db with their stored passage embeddings; the
+# batched keywords are checked against the per-chunk ones.
+
+
+def load_chunks(count):
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    try:
+        return conn.execute(
+            """
+            SELECT text, embedding FROM chunks
+            WHERE text IS NOT NULL AND embedding IS NOT NULL LIMIT ?
+            """,
+            (count,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    rows = load_chunks(count)
+    if not rows:
+        print("No chunks with embeddings in the database")
+        return
+    texts = [r[0] for r in rows]
+    doc_embeddings = [decode_embedding(r[1]) for r in rows]
+    kw_model = get_kw_model()
+
+    # count candidate phrases sent to the model
+    embed = kw_model.model.embed
+    encoded = [0]
+
+    def counting_embed(documents, verbose=False):
+        encoded[0] += len(documents)
+        return embed(documents, verbose)
+
+    kw_model.model.embed = counting_embed
+    kw_model.extract_keywords("warm up")
+
+    encoded[0] = 0
+    started = time.perf_counter()
+    per_chunk = []
+    for text, embedding in zip(texts, doc_embeddings):
+        keywords = kw_model.extract_keywords(
+            text,
+            keyphrase_ngram_range=(1, 2),
+            stop_words=stop_words_vi_en,
+            top_n=top_n,
+            doc_embeddings=np.asarray(embedding, dtype=np.float32).reshape(1, -1),
+        )
+        per_chunk.append([kw[0] for kw in keywords])
+    per_chunk_seconds = time.perf_counter() - started
+    per_chunk_encoded = encoded[0]
+    print(
+        f"{len(texts)} chunks, top {top_n}\n"
+        f"per chunk: {per_chunk_seconds:7.2f}s, {per_chunk_encoded} candidates encoded"
+    )
+
+    for name, clear_candidates in (("batched", True), ("warm", False)):
+        keyword_cache.clear()
+        if clear_candidates:
+            candidate_embedding_cache.clear()
+        encoded[0] = 0
+        started = time.perf_counter()
+        batched = extract_keywords_batch(texts, top_n, doc_embeddings)
+        seconds = time.perf_counter() - started
+        same = np.mean([a == b for a, b in zip(batched, per_chunk)])
+        print(
+            f"{name + ':':<10} {seconds:7.2f}s, {encoded[0]} candidates encoded, "
+            f"{per_chunk_seconds / seconds:.1f}x, identical keywords {same:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import sqlite3
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config.database import DB_PATH
+from utils.minhash_utils import minhash_signature, find_copy_candidates
+from utils.plagiarism_utils import jaccard_similarity
+
+# Recall and cost of the MinHash LSH copy candidates against a brute-force
+# shingle Jaccard over every chunk of other materials.
+# Usage: python benchmarks/bench_minhash_recall.py [num_materials] [threshold]
+# Run backfill_minhash.py first on databases ingested before the index existed.
+# Every course is searched (global scope).
+
+
+def main():
+    num_materials = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    threshold = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'chunk_lsh'"
+    )
+    if not cursor.fetchone() or not cursor.execute(
+        "SELECT 1 FROM chunk_lsh LIMIT 1"
+    ).fetchone():
+        print("[ERROR] No MinHash index in the database; run backfill_minhash.py first")
+        conn.close()
+        sys.exit(1)
+    corpus = cursor.execute(
+        "SELECT faissId, materialId, text FROM chunks WHERE text IS NOT NULL"
+    ).fetchall()
+    material_ids = sorted({m for _, m, _ in corpus})[:num_materials]
+    # the probe table is a temporary one, which a read-only connection may write
+    cursor.execute("PRAGMA temp_store = MEMORY")
+
+    expected = found = 0
+    lsh_seconds = brute_seconds = 0.0
+    for material_id in material_ids:
+        chunks = [text for _, m, text in corpus if m == material_id]
+
+        started = time.perf_counter()
+        signatures = {i: minhash_signature(t) for i, t in enumerate(chunks)}
+        candidates = find_copy_candidates(
+            cursor, signatures, material_id, None, scope="global"
+        )
+        lsh_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        for i, text in enumerate(chunks):
+            copies = {
+                fid
+                for fid, m, other in corpus
+                if m != material_id and jaccard_similarity(text, other) >= threshold
+            }
+            expected += len(copies)
+            found += len(copies & set(candidates.get(i, [])))
+        brute_seconds += time.perf_counter() - started
+    conn.close()
+
+    print(f"{len(material_ids)} materials against {len(corpus)} chunks")
+    print(
+        f"pairs with Jaccard >= {threshold}: {expected}, found by LSH: {found} "
+        f"(recall {found / expected if expected else 1.0:.3f})"
+    )
+    print(f"lsh: {lsh_seconds:.3f}s, brute force: {brute_seconds:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
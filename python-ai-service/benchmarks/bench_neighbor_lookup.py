@@ -0,0 +1,74 @@
+import os
+import sys
+import time
+import sqlite3
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config.database import DB_PATH
+from utils.shingle_utils import decode_shingles
+from utils.neighbor_utils import neighbor_top_k
+from utils.faiss_utils import search_shards
+from utils.plagiarism_utils import scan_database, lookup_database
+
+# Database stage of a course-scope check for one material: the live FAISS and
+# MinHash scan against the chunk_neighbors rows stored at ingest.
+# Usage: python benchmarks/bench_neighbor_lookup.py <material_id> [repeats]
+# Run precompute_neighbors (or one plagiarism check) on the material first.
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python benchmarks/bench_neighbor_lookup.py <material_id> [repeats]")
+        sys.exit(1)
+    material_id = int(sys.argv[1])
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT faissId, text, embedding, shingles FROM chunks WHERE materialId=?",
+        (material_id,),
+    )
+    rows = cursor.fetchall()
+    cursor.execute("SELECT courseId FROM materials WHERE id=?", (material_id,))
+    course_id = cursor.fetchone()[0]
+    chunks = [r[:3] for r in rows]
+    shards = search_shards(course_id, "course")
+    chunk_shingles = [
+        decode_shingles(r[3]) if r[3] is not None else None for r in rows
+    ]
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        live, _ = scan_database(
+            cursor,
+            material_id,
+            chunks,
+            shards,
+            course_id=course_id,
+            scope="course",
+            chunk_shingles=chunk_shingles,
+            top_k=neighbor_top_k,
+        )
+    live_seconds = (time.perf_counter() - started) / repeats
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        stored, _ = lookup_database(cursor, material_id, chunks, course_id)
+    stored_seconds = (time.perf_counter() - started) / repeats
+    conn.close()
+
+    def keys(matches):
+        return {(m["chunkFaissId"], m["neighborFaissId"]) for m in matches}
+
+    print(f"material {material_id}: {len(chunks)} chunks")
+    print(f"live scan: {live_seconds * 1000:.1f} ms, {len(live)} matches")
+    print(f"lookup:    {stored_seconds * 1000:.1f} ms, {len(stored)} matches")
+    print(
+        f"pairs only live: {len(keys(live) - keys(stored))}, "
+        f"only stored: {len(keys(stored) - keys(live))}"
+    )
+
+
+if __name__ == "__main__":
+    main()
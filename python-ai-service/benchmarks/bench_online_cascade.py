@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config.database import DB_PATH
+from utils import plagiarism_utils
+from utils.plagiarism_utils import (
+    score_snippets,
+    embed_query,
+    snippet_embedding_cache,
+    cascade_stats,
+)
+
+# Work per scan of the staged online scorer against aligning every snippet
+# (every stage threshold at its minimum, the old behaviour). Both runs embed and
+# report every snippet; only the alignment stage is skipped.
+# Usage: python benchmarks/bench_online_cascade.py [num_chunks] [snippets_per_chunk]
+# Snippets stand in for fetched pages: unrelated stored chunks, plus one edited
+# copy of the chunk itself that must keep its EXACT COPY score in both runs.
+exact_threshold = 0.90
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    per_chunk = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    texts = [r[0] for r in conn.execute("SELECT text FROM chunks WHERE text IS NOT NULL")]
+    conn.close()
+    if len(texts) < 2:
+        print("Need at least two chunks")
+        return
+    rng = random.Random(0)
+    chunks = texts[:count]
+    pages = [
+        ["According to the source, " + c]
+        + rng.sample([t for t in texts if t != c], min(per_chunk - 1, len(texts) - 1))
+        for c in chunks
+    ]
+    queries = [embed_query(c) for c in chunks]
+
+    thresholds = {
+        "all snippets": (-1.0, -1.0),
+        "cascade": (
+            plagiarism_utils.CASCADE_LEXICAL_THRESHOLD,
+            plagiarism_utils.CASCADE_SEMANTIC_THRESHOLD,
+        ),
+    }
+    for name, (lexical, semantic) in thresholds.items():
+        plagiarism_utils.CASCADE_LEXICAL_THRESHOLD = lexical
+        plagiarism_utils.CASCADE_SEMANTIC_THRESHOLD = semantic
+        snippet_embedding_cache.clear()
+        before = cascade_stats()
+        started = time.perf_counter()
+        copies = reported = 0
+        for chunk, query, snippets in zip(chunks, queries, pages):
+            rows = score_snippets(chunk, query, snippets)
+            reported += len(rows)
+            scored = {row[0]: row for row in rows}
+            row = scored.get(snippets[0])
+            if row is not None and row[4] >= exact_threshold:
+                copies += 1
+        seconds = time.perf_counter() - started
+        after = cascade_stats()
+        work = {k: after[k] - before[k] for k in ("snippets", "lexicalPassed", "semanticPassed")}
+        print(
+            f"{name:<13} {seconds:6.2f}s, reported {reported}/{work['snippets']}, "
+            f"bigram gate {work['lexicalPassed']}, aligned {work['semanticPassed']}, "
+            f"copies found {copies}/{len(chunks)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
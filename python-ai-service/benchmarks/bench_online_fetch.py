@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import threading
+import urllib.parse
+from aiohttp import web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils import fetch_engine, web_cache
+
+# Online phase of a scan against a local stand-in for DuckDuckGo lite and the
+# result pages, each response delayed by one simulated round trip.
+# Usage: python benchmarks/bench_online_fetch.py [num_chunks] [rtt_ms]
+# Pages are spread over page_hosts loopback addresses (127.0.0.2, ...) so the
+# per-host limit applies as it would on the real web. The sequential baseline
+# (one request after another, the old behaviour) runs on a tenth of the chunks
+# and is scaled up. A second concurrent run shows a repeated scan served from
+# the web cache (a fresh temporary file, so the first run starts cold).
+results_per_query = 3
+page_hosts = 16
+page_text = " ".join(
+    f"Sentence {i} about algorithms, data structures and course material."
+    for i in range(60)
+)
+
+
+def start_server(rtt):
+    async def lite(request):
+        await asyncio.sleep(rtt)
+        query = request.query.get("q", "")
+        links = []
+        for i in range(results_per_query):
+            # the same query always returns the same pages, like a real engine
+            host = f"127.0.0.{2 + (hash(query) + i) % page_hosts}"
+            page = f"http://{host}:{port}/page/{abs(hash(query)) % 10**6}/{i}"
+            links.append(
+                f'<a href="/l/?uddg={urllib.parse.quote(page, safe="")}">result</a>'
+            )
+        return web.Response(text="".join(links), content_type="text/html")
+
+    async def page(request):
+        await asyncio.sleep(rtt)
+        html = f"<html><body><article><p>{page_text}</p></article></body></html>"
+        return web.Response(text=html, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/lite/", lite)
+    app.router.add_get("/page/{query}/{i}", page)
+
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app, access_log=None)
+    loop.run_until_complete(runner.setup())
+    port = 0
+    for i in range(1, page_hosts + 2):
+        site = web.TCPSite(runner, f"127.0.0.{i}", port)
+        loop.run_until_complete(site.start())
+        port = port or site._server.sockets[0].getsockname()[1]
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return port
+
+
+def main():
+    num_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rtt = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    port = start_server(rtt)
+    web_cache.WEB_CACHE_PATH = os.path.join(tempfile.mkdtemp(), "web_cache.db")
+    fetch_engine.DDG_LITE_URL = f"http://127.0.0.1:{port}/lite/"
+    queries = [f"chunk {i} keywords" for i in range(num_chunks)]
+    print(
+        f"{num_chunks} chunks, rtt {rtt * 1000:.0f} ms, "
+        f"limits {fetch_engine.FETCH_MAX_CONCURRENCY} total / "
+        f"{fetch_engine.FETCH_PER_HOST} per host"
+    )
+
+    # connection setup is not part of the comparison
+    fetch_engine.run(fetch_engine.gather_online(["warm up"]))
+
+    started = time.perf_counter()
+    urls, snippets = fetch_engine.run(
+        fetch_engine.gather_online(queries, results_per_query)
+    )
+    seconds = time.perf_counter() - started
+    fetched = sum(1 for s in snippets.values() if s)
+    print(
+        f"concurrent: {seconds:6.2f}s ({seconds / rtt:.0f} rtt), "
+        f"{sum(map(len, urls))} results, {fetched}/{len(snippets)} pages with text"
+    )
+
+    before = web_cache.cache_stats()
+    started = time.perf_counter()
+    fetch_engine.run(fetch_engine.gather_online(queries, results_per_query))
+    seconds = time.perf_counter() - started
+    after = web_cache.cache_stats()
+    hits = {k: after[f"{k}Hits"] - before[f"{k}Hits"] for k in ("search", "snippet")}
+    print(
+        f"repeated:   {seconds:6.2f}s ({seconds / rtt:.1f} rtt), cache hits "
+        f"{hits['search']}/{len(queries)} searches, {hits['snippet']}/{len(snippets)} pages"
+    )
+
+    # the baseline must hit the network too
+    sample = [f"sequential {q}" for q in queries[: max(1, num_chunks // 10)]]
+    started = time.perf_counter()
+    for query in sample:
+        for url in fetch_engine.run(fetch_engine.search(query, results_per_query)):
+            fetch_engine.run(fetch_engine.fetch_snippets(url))
+    seconds = (time.perf_counter() - started) * num_chunks / len(sample)
+    print(f"sequential: {seconds:6.2f}s ({seconds / rtt:.0f} rtt, extrapolated)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import os
+import sys
+import sqlite3
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config.database import DB_PATH
+from utils.plagiarism_utils import chunk_queries, cluster_queries
+
+# Searches a scan sends per material at several QUERY_CLUSTER_THRESHOLD values,
+# from the keyword queries of the stored chunks.
+# Usage: python benchmarks/bench_query_clusters.py [num_results]
+thresholds = [1.0, 0.8, 0.6, 0.4]
+
+
+def main():
+    num_results = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    try:
+        material_ids = [
+            r[0] for r in conn.execute("SELECT DISTINCT materialId FROM chunks")
+        ]
+        materials = [
+            conn.execute(
+                "SELECT faissId, text, embedding FROM chunks WHERE materialId=?",
+                (mid,),
+            ).fetchall()
+            for mid in material_ids
+        ]
+    finally:
+        conn.close()
+
+    queries = [chunk_queries(rows) for rows in materials if rows]
+    total = sum(len(q) for q in queries)
+    print(f"{len(queries)} materials, {total} chunk queries")
+    for threshold in thresholds:
+        searches = 0
+        results = 0
+        for material_queries in queries:
+            planned, _ = cluster_queries(material_queries, num_results, threshold)
+            searches += len(planned)
+            results += sum(n for _, n in planned)
+        print(
+            f"threshold {threshold:.1f}: {searches} searches "
+            f"({searches / total:.2f} per chunk), {results} results requested"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import sqlite3
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config.database import DB_PATH
+from utils.embedding_utils import encode_embedding, decode_embedding
+from utils.embedding_batcher import embed_texts
+
+# Scan-time cost and accuracy of the QUERY_EMBEDDING_MODE options on stored chunks.
+# Usage: python benchmarks/bench_query_embeddings.py [num_chunks]
+# "encode" (the model at scan time) is the reference. "stored" reads the
+# ingest-time query embedding (encoded here when the chunk predates the column,
+# through the same storage round trip). "passage" reuses chunks.embedding.
+# Snippets are stand-ins for web text: every other chunk, plus the first 60% of
+# the chunk itself as a near-copy.
+semantic_threshold = 0.80
+
+
+def load_chunks(count):
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    try:
+        return conn.execute(
+            """
+            SELECT text, embedding, queryEmbedding FROM chunks
+            WHERE text IS NOT NULL AND embedding IS NOT NULL LIMIT ?
+            """,
+            (count,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def normalized(embeddings):
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def compare(name, queries, reference, snippets):
+    sims = queries @ snippets.T
+    ref_sims = reference @ snippets.T
+    diff = np.abs(sims - ref_sims)
+    top1 = np.mean(sims.argmax(axis=1) == ref_sims.argmax(axis=1))
+    decisions = np.mean(
+        (sims >= semantic_threshold) == (ref_sims >= semantic_threshold)
+    )
+    print(
+        f"{name:<8} mean |dSim| {diff.mean():.4f}  max {diff.max():.4f}  "
+        f"top-1 agreement {top1:.3f}  threshold agreement {decisions:.4f}"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rows = load_chunks(count)
+    if len(rows) < 2:
+        print("Need at least two chunks with embeddings")
+        return
+    texts = [r[0] for r in rows]
+    passages = np.stack([decode_embedding(r[1]) for r in rows])
+    embed_texts(["query: warm up"])
+
+    # what the scan pays per chunk in each mode
+    started = time.perf_counter()
+    reference = normalized(embed_texts([f"query: {t}" for t in texts]))
+    encode_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    stored = np.stack(
+        [
+            decode_embedding(r[2] if r[2] is not None else encode_embedding(ref))
+            for r, ref in zip(rows, reference)
+        ]
+    )
+    decode_seconds = time.perf_counter() - started
+    missing = sum(1 for r in rows if r[2] is None)
+
+    heads = [" ".join(t.split()[: max(1, len(t.split()) * 6 // 10)]) for t in texts]
+    near_copies = normalized(embed_texts([f"passage: {h}" for h in heads]))
+
+    print(f"{len(rows)} chunks ({missing} without a stored query embedding)")
+    print(
+        f"query side per chunk: encode {encode_seconds / len(rows) * 1000:.2f} ms, "
+        f"stored/passage {decode_seconds / len(rows) * 1000:.3f} ms"
+    )
+
+    # each chunk against the other chunks and its own near-copy
+    snippets = np.concatenate([passages, near_copies])
+    compare("stored", stored, reference, snippets)
+    compare("passage", passages, reference, snippets)
+
+    own = np.arange(len(rows))
+    modes = [("encode", reference), ("stored", stored), ("passage", passages)]
+    for name, queries in modes:
+        copy_sims = np.sum(queries * near_copies[own], axis=1)
+        flagged = np.mean(copy_sims >= semantic_threshold)
+        print(
+            f"{name:<8} near-copy similarity mean {copy_sims.mean():.4f}, "
+            f"flagged at {semantic_threshold}: {flagged:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import sqlite3
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from config.database import DB_PATH
+from utils.text_utils import normalized_words
+from utils.shingle_utils import shingle_hashes, decode_shingles, jaccard_pairs
+
+# 5-gram Jaccard of every chunk against num_neighbors other chunks: Python sets
+# of word tuples rebuilt per pair (the old jaccard_similarity) against the
+# shingle hashes stored at ingest, scored with one jaccard_pairs call.
+# Usage: python benchmarks/bench_shingle_jaccard.py [num_chunks] [num_neighbors]
+# Databases older than the shingles column need backfill_minhash.py first;
+# chunks it left without shingles are hashed here.
+
+
+def set_jaccard(text1, text2, n=5):
+    def ngrams(text):
+        words = normalized_words(text)
+        return set(tuple(words[i : i + n]) for i in range(len(words) - n + 1))
+
+    set1, set2 = ngrams(text1), ngrams(text2)
+    if not set1 or not set2:
+        return 0.0
+    return len(set1 & set2) / len(set1 | set2)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    num_neighbors = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    conn = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    columns = [r[1] for r in conn.execute("PRAGMA table_info(chunks)")]
+    if "shingles" not in columns:
+        print("[ERROR] chunks.shingles is missing; run backfill_minhash.py first")
+        conn.close()
+        sys.exit(1)
+    rows = conn.execute(
+        "SELECT text, shingles FROM chunks WHERE text IS NOT NULL LIMIT ?", (count,)
+    ).fetchall()
+    conn.close()
+    if len(rows) < 2:
+        print("Need at least two chunks")
+        return
+    texts = [r[0] for r in rows]
+    hashes = [
+        decode_shingles(r[1]) if r[1] is not None else shingle_hashes(r[0])
+        for r in rows
+    ]
+    stored = sum(1 for r in rows if r[1] is not None)
+    rng = np.random.default_rng(0)
+    pairs = [
+        (i, int(j))
+        for i in range(len(rows))
+        for j in rng.choice(len(rows), min(num_neighbors, len(rows)), replace=False)
+    ]
+
+    started = time.perf_counter()
+    old = [set_jaccard(texts[i], texts[j]) for i, j in pairs]
+    old_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    new = jaccard_pairs([hashes[i] for i, _ in pairs], [hashes[j] for _, j in pairs])
+    new_seconds = time.perf_counter() - started
+
+    print(f"{len(rows)} chunks ({stored} with stored shingles), {len(pairs)} pairs")
+    print(f"python sets:   {old_seconds:.3f}s ({old_seconds / len(pairs) * 1e6:.1f} us/pair)")
+    print(f"jaccard_pairs: {new_seconds:.3f}s ({new_seconds / len(pairs) * 1e6:.1f} us/pair)")
+    print(f"max |difference|: {np.max(np.abs(np.array(old) - new)):.2e}")
+
+
+if __name__ == "__main__":
+    main()
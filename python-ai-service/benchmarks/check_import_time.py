@@ -0,0 +1,72 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+
+# Import-time budget: `import app` must stay fast and must not load any model.
+# Usage: python benchmarks/check_import_time.py [budget_seconds]
+# Exits 1 when the best of `runs` imports is over budget or a heavy module
+# (torch, sentence_transformers, keybert, langchain) was imported.
+# `import app` migrates the database, so the probe runs on a temporary copy.
+runs = 3
+heavy_modules = ["torch", "sentence_transformers", "keybert", "langchain"]
+
+service_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+probe = f"""
+import sys, time, json
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+heavy = [m for m in {heavy_modules!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def measure(work_dir):
+    db_path = os.path.join(work_dir, "database.db")
+    source = os.path.join(service_dir, "database.db")
+    if os.path.exists(source):
+        shutil.copyfile(source, db_path)
+    # no workers or warm-up thread, only the import itself is measured
+    env = dict(
+        os.environ,
+        WARMUP_ON_START="0",
+        INGEST_WORKERS="0",
+        DB_PATH=db_path,
+        WEB_CACHE_PATH=os.path.join(work_dir, "web_cache.db"),
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=service_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    results = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as work_dir:
+            results.append(measure(work_dir))
+    best = min(r["seconds"] for r in results)
+    heavy = sorted({m for r in results for m in r["heavy"]})
+
+    print(f"import app: best {best:.3f}s of {runs} runs (budget {budget:.3f}s)")
+    ok = best <= budget
+    if not ok:
+        print("[ERROR] import time is over budget")
+    if heavy:
+        print(f"[ERROR] heavy modules imported eagerly: {', '.join(heavy)}")
+        ok = False
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import os
+import sys
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# small enough for the trained layouts to build on the synthetic vectors
+os.environ.setdefault("FAISS_MIN_TRAIN_SIZE", "256")
+
+from models.embedding import dimension
+from utils.faiss_utils import build_index, index_type_of, set_search_params
+
+# Ids returned after remove_ids, per layout: every remaining vector searched by
+# itself must come back under its own id, and no removed id may come back.
+# Usage: python benchmarks/check_remove_ids.py [num_vectors]
+# Exits 1 on any mismatch. HNSW cannot remove ids and is rebuilt by
+# remove_vectors instead, so it is skipped here.
+layouts = ["flat", "ivf_flat", "ivf_pq", "sq8", "sqfp16", "pq"]
+min_recall = 0.9
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((n, dimension)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    ids = np.arange(1, n + 1, dtype=np.int64)
+    removed = np.concatenate([ids[:100], ids[200::7]])
+    keep = ~np.isin(ids, removed)
+
+    ok = True
+    for layout in layouts:
+        index = build_index(layout, vectors, ids)
+        built = index_type_of(index)
+        set_search_params(index, nprobe=1 << 16)
+        index.remove_ids(removed)
+        _, found = index.search(vectors[keep], 5)
+        recall = float(np.mean(found[:, 0] == ids[keep]))
+        stale = int(np.isin(found, removed).sum())
+        passed = index.ntotal == keep.sum() and recall >= min_recall and not stale
+        ok = ok and passed
+        print(
+            f"{layout:<9} built as {built:<9} ntotal {index.ntotal:>5}  "
+            f"self-recall {recall:.3f}  removed ids returned {stale}  "
+            f"{'ok' if passed else 'FAIL'}"
+        )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import os
+import sys
+import time
+import resource
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from models.embedding import get_model
+from utils.plagiarism_utils import extract_keywords, keyword_cache, stop_words_vi_en
+
+# Keyword quality and memory of KeyBERT on the shared e5 model against the
+# separate distiluse model it replaced, on a fixed Vietnamese/English sample set.
+# Usage: python benchmarks/compare_keywords.py [top_n]
+# A keyword counts as a hit when it contains, or is contained in, one of the
+# sample's reference terms. Needs both models (downloaded on first run).
+old_model_name = "distiluse-base-multilingual-cased-v2"
+
+samples = [
+    (
+        "vi",
+        "Thuật toán sắp xếp nhanh (quicksort) chọn một phần tử làm chốt, chia mảng "
+        "thành hai phần nhỏ hơn và lớn hơn chốt rồi sắp xếp đệ quy từng phần. Độ "
+        "phức tạp trung bình là O(n log n), trường hợp xấu nhất là O(n^2).",
+        ["quicksort", "sắp xếp", "chốt", "đệ quy", "độ phức tạp"],
+    ),
+    (
+        "vi",
+        "Mạng nơ-ron tích chập (CNN) sử dụng các bộ lọc để trích xuất đặc trưng từ "
+        "ảnh. Lớp gộp (pooling) giảm kích thước không gian, còn lớp kết nối đầy đủ "
+        "ở cuối thực hiện phân loại.",
+        ["tích chập", "cnn", "bộ lọc", "đặc trưng", "pooling", "phân loại"],
+    ),
+    (
+        "vi",
+        "Chuẩn hóa cơ sở dữ liệu nhằm loại bỏ dư thừa dữ liệu. Dạng chuẩn 3NF yêu cầu "
+        "mọi thuộc tính không khóa phụ thuộc trực tiếp vào khóa chính, không phụ "
+        "thuộc bắc cầu.",
+        ["chuẩn hóa", "cơ sở dữ liệu", "3nf", "khóa chính", "phụ thuộc"],
+    ),
+    (
+        "vi",
+        "Blockchain là sổ cái phân tán, các khối được liên kết bằng hàm băm. Cơ chế "
+        "đồng thuận như bằng chứng công việc giúp các nút thống nhất trạng thái mà "
+        "không cần bên trung gian.",
+        ["blockchain", "sổ cái", "hàm băm", "đồng thuận", "bằng chứng công việc"],
+    ),
+    (
+        "vi",
+        "Giao thức TCP đảm bảo truyền dữ liệu tin cậy nhờ bắt tay ba bước, số thứ tự "
+        "và cơ chế báo nhận. UDP không thiết lập kết nối nên nhanh hơn nhưng có thể "
+        "mất gói tin.",
+        ["tcp", "udp", "bắt tay", "gói tin", "kết nối"],
+    ),
+    (
+        "en",
+        "Gradient descent updates model parameters in the direction of the negative "
+        "gradient of the loss function. The learning rate controls the step size; "
+        "too large a rate makes training diverge.",
+        ["gradient descent", "learning rate", "loss function", "parameters"],
+    ),
+    (
+        "en",
+        "A hash table maps keys to buckets with a hash function. Collisions are "
+        "resolved by chaining or open addressing, and lookups take constant time on "
+        "average when the load factor stays low.",
+        ["hash table", "hash function", "collisions", "chaining", "load factor"],
+    ),
+    (
+        "en",
+        "The TCP three-way handshake exchanges SYN, SYN-ACK and ACK segments before "
+        "any data is sent, so both sides agree on initial sequence numbers.",
+        ["tcp", "handshake", "syn", "sequence numbers"],
+    ),
+    (
+        "en",
+        "Photosynthesis converts light energy into chemical energy. Chlorophyll in "
+        "the chloroplasts absorbs light, and the Calvin cycle fixes carbon dioxide "
+        "into glucose.",
+        ["photosynthesis", "chlorophyll", "calvin cycle", "glucose", "light energy"],
+    ),
+    (
+        "en",
+        "Database normalization removes redundancy. Third normal form requires that "
+        "every non-key attribute depends only on the primary key, with no "
+        "transitive dependencies.",
+        ["normalization", "third normal form", "primary key", "dependencies"],
+    ),
+]
+
+
+def rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def hits(keywords, reference):
+    return sum(
+        1
+        for kw in keywords
+        if any(ref in kw.lower() or kw.lower() in ref for ref in reference)
+    )
+
+
+def run(name, extract, top_n):
+    total_hits, total_kws, elapsed, results = 0, 0, 0.0, []
+    for _, text, reference in samples:
+        started = time.perf_counter()
+        keywords = extract(text, top_n)
+        elapsed += time.perf_counter() - started
+        total_hits += hits(keywords, reference)
+        total_kws += len(keywords)
+        results.append(keywords)
+    print(
+        f"{name:<10} precision@{top_n} {total_hits / max(total_kws, 1):.3f}  "
+        f"{elapsed / len(samples) * 1000:.0f} ms/chunk"
+    )
+    return results
+
+
+def main():
+    top_n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    base_rss = rss_mb()
+
+    get_model()
+    e5_rss = rss_mb()
+
+    def shared(text, n):
+        keyword_cache.clear()
+        return extract_keywords(text, top_n=n)
+
+    # first call loads keybert itself; keep it out of the timings
+    shared("warm up", top_n)
+    new_results = run("shared e5", shared, top_n)
+    shared_rss = rss_mb()
+
+    from keybert import KeyBERT
+
+    old_model = KeyBERT(model=old_model_name)
+    old_model.extract_keywords("warm up")
+    old_rss = rss_mb()
+
+    def separate(text, n):
+        return [
+            kw
+            for kw, _ in old_model.extract_keywords(
+                text,
+                keyphrase_ngram_range=(1, 2),
+                stop_words=stop_words_vi_en,
+                top_n=n,
+            )
+        ]
+
+    old_results = run("distiluse", separate, top_n)
+
+    overlap = [
+        len(set(a) & set(b)) / max(len(set(a) | set(b)), 1)
+        for a, b in zip(new_results, old_results)
+    ]
+    print(f"keyword overlap (jaccard) {sum(overlap) / len(overlap):.3f}")
+    print(
+        f"peak RSS: imports {base_rss:.0f} MB, e5 {e5_rss:.0f} MB, "
+        f"e5 + keybert {shared_rss:.0f} MB, + distiluse {old_rss:.0f} MB "
+        f"(second model costs {old_rss - shared_rss:.0f} MB)"
+    )
+
+    for (lang, text, _), new, old in zip(samples, new_results, old_results):
+        print(f"\n[{lang}] {text[:60]}...")
+        print(f"  shared e5: {', '.join(new)}")
+        print(f"  distiluse: {', '.join(old)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,131 @@
 import os
+import sqlite3
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "database.db")
\ No newline at end of file
+DB_PATH = os.getenv(
+    "DB_PATH", os.path.join(os.path.dirname(__file__), "..", "database.db")
+)
+
+
+# create tables, columns and indexes added after the first release on databases
+# built by an older init_db.py
+def ensure_schema():
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                materialId INTEGER NOT NULL,
+                target TEXT NOT NULL CHECK(target IN ('course','submission')),
+                submissionId TEXT,
+                status TEXT DEFAULT 'queued'
+                    CHECK(status IN ('queued','running','done','error')),
+                attempts INTEGER DEFAULT 0,
+                error TEXT,
+                createdAt TEXT DEFAULT (datetime('now')),
+                startedAt TEXT,
+                finishedAt TEXT
+            )
+            """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS faiss_id_sequence (
+                name TEXT PRIMARY KEY,
+                nextId INTEGER NOT NULL
+            )
+            """
+        )
+        cursor.execute("PRAGMA table_info(chunks)")
+        chunk_columns = {r[1] for r in cursor.fetchall()}
+        if "queryEmbedding" not in chunk_columns:
+            cursor.execute("ALTER TABLE chunks ADD COLUMN queryEmbedding BLOB")
+        if "minhash" not in chunk_columns:
+            cursor.execute("ALTER TABLE chunks ADD COLUMN minhash BLOB")
+        if "shingles" not in chunk_columns:
+            cursor.execute("ALTER TABLE chunks ADD COLUMN shingles BLOB")
+        cursor.execute("PRAGMA table_info(materials)")
+        if "neighborsReady" not in {r[1] for r in cursor.fetchall()}:
+            cursor.execute(
+                "ALTER TABLE materials ADD COLUMN neighborsReady INTEGER DEFAULT 0"
+            )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunk_lsh (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                faissId INTEGER NOT NULL,
+                PRIMARY KEY (band, bucket, faissId)
+            ) WITHOUT ROWID
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chunk_lsh_faissId ON chunk_lsh(faissId)"
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunk_neighbors (
+                faissId INTEGER NOT NULL,
+                neighborFaissId INTEGER NOT NULL,
+                semantic REAL NOT NULL,
+                ngram REAL NOT NULL,
+                exact REAL NOT NULL,
+                similarity REAL NOT NULL,
+                spans TEXT NOT NULL,
+                source TEXT NOT NULL,
+                PRIMARY KEY (faissId, neighborFaissId)
+            ) WITHOUT ROWID
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chunk_neighbors_neighborFaissId "
+            "ON chunk_neighbors(neighborFaissId)"
+        )
+        # materials that listed a deleted chunk lost one of their stored neighbors
+        # and go back to a live scan; recreated so older databases get the reset
+        cursor.execute("DROP TRIGGER IF EXISTS trg_chunks_delete_neighbors")
+        cursor.execute(
+            """
+            CREATE TRIGGER trg_chunks_delete_neighbors
+            AFTER DELETE ON chunks
+            BEGIN
+                UPDATE materials SET neighborsReady = 0
+                WHERE neighborsReady = 1 AND id IN (
+                    SELECT c.materialId FROM chunk_neighbors n
+                    JOIN chunks c ON c.faissId = n.faissId
+                    WHERE n.neighborFaissId = OLD.faissId
+                );
+                DELETE FROM chunk_neighbors
+                WHERE faissId = OLD.faissId OR neighborFaissId = OLD.faissId;
+            END
+            """
+        )
+        # every path that deletes chunks also drops their LSH buckets
+        cursor.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_chunks_delete_lsh
+            AFTER DELETE ON chunks
+            BEGIN
+                DELETE FROM chunk_lsh WHERE faissId = OLD.faissId;
+            END
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chunks_faissId ON chunks(faissId)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_materials_courseId ON materials(courseId)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_materials_submissionId ON materials(submissionId)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_materialId ON jobs(materialId)"
+        )
+        conn.commit()
+    finally:
+        conn.close()
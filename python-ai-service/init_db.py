@@ -4,12 +4,12 @@ import os
 DB_PATH = "database.db"
 
 
-def init_db():
-    if os.path.exists(DB_PATH):
-        os.remove(DB_PATH)
+def init_db(db_path=DB_PATH):
+    if os.path.exists(db_path):
+        os.remove(db_path)
         print("Old database was deleted and created...")
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
     # --- Table: materials ---
@@ -28,7 +28,8 @@ def init_db():
             processingStatus TEXT DEFAULT 'pending' 
                 CHECK(processingStatus IN ('pending','processing','done','error')),
             chunkCount INTEGER DEFAULT 0,
-            extractedTextLength INTEGER DEFAULT 0
+            extractedTextLength INTEGER DEFAULT 0,
+            neighborsReady INTEGER DEFAULT 0
         )
     """
     )
@@ -41,15 +42,111 @@ def init_db():
             materialId INTEGER NOT NULL,
             faissId INTEGER,
             text TEXT,
-            embedding TEXT,
+            embedding BLOB,
+            queryEmbedding BLOB,
+            minhash BLOB,
+            shingles BLOB,
             createdAt TEXT DEFAULT (datetime('now')),
             FOREIGN KEY (materialId) REFERENCES materials(id) ON DELETE CASCADE
         )
     """
     )
 
+    # --- Table: jobs (background ingestion queue) ---
+    cursor.execute(
+        """
+        CREATE TABLE jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            materialId INTEGER NOT NULL,
+            target TEXT NOT NULL CHECK(target IN ('course','submission')),
+            submissionId TEXT,
+            status TEXT DEFAULT 'queued'
+                CHECK(status IN ('queued','running','done','error')),
+            attempts INTEGER DEFAULT 0,
+            error TEXT,
+            createdAt TEXT DEFAULT (datetime('now')),
+            startedAt TEXT,
+            finishedAt TEXT
+        )
+    """
+    )
+
+    # --- Table: faiss_id_sequence (next free FAISS id, shared by both indexes) ---
+    cursor.execute(
+        """
+        CREATE TABLE faiss_id_sequence (
+            name TEXT PRIMARY KEY,
+            nextId INTEGER NOT NULL
+        )
+    """
+    )
+
+    # --- Table: chunk_lsh (MinHash LSH buckets of every chunk, one row per band) ---
+    cursor.execute(
+        """
+        CREATE TABLE chunk_lsh (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            faissId INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, faissId)
+        ) WITHOUT ROWID
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER trg_chunks_delete_lsh
+        AFTER DELETE ON chunks
+        BEGIN
+            DELETE FROM chunk_lsh WHERE faissId = OLD.faissId;
+        END
+    """
+    )
+
+    # --- Table: chunk_neighbors (precomputed database matches, both directions) ---
+    cursor.execute(
+        """
+        CREATE TABLE chunk_neighbors (
+            faissId INTEGER NOT NULL,
+            neighborFaissId INTEGER NOT NULL,
+            semantic REAL NOT NULL,
+            ngram REAL NOT NULL,
+            exact REAL NOT NULL,
+            similarity REAL NOT NULL,
+            spans TEXT NOT NULL,
+            source TEXT NOT NULL,
+            PRIMARY KEY (faissId, neighborFaissId)
+        ) WITHOUT ROWID
+    """
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER trg_chunks_delete_neighbors
+        AFTER DELETE ON chunks
+        BEGIN
+            UPDATE materials SET neighborsReady = 0
+            WHERE neighborsReady = 1 AND id IN (
+                SELECT c.materialId FROM chunk_neighbors n
+                JOIN chunks c ON c.faissId = n.faissId
+                WHERE n.neighborFaissId = OLD.faissId
+            );
+            DELETE FROM chunk_neighbors
+            WHERE faissId = OLD.faissId OR neighborFaissId = OLD.faissId;
+        END
+    """
+    )
+
     # Indexing
     cursor.execute("CREATE INDEX idx_chunks_materialId ON chunks(materialId)")
+    cursor.execute("CREATE INDEX idx_chunks_faissId ON chunks(faissId)")
+    cursor.execute("CREATE INDEX idx_chunk_lsh_faissId ON chunk_lsh(faissId)")
+    cursor.execute(
+        "CREATE INDEX idx_chunk_neighbors_neighborFaissId "
+        "ON chunk_neighbors(neighborFaissId)"
+    )
+    cursor.execute("CREATE INDEX idx_materials_courseId ON materials(courseId)")
+    cursor.execute("CREATE INDEX idx_materials_submissionId ON materials(submissionId)")
+    cursor.execute("CREATE INDEX idx_jobs_status ON jobs(status, id)")
+    cursor.execute("CREATE INDEX idx_jobs_materialId ON jobs(materialId)")
 
     conn.commit()
     conn.close()
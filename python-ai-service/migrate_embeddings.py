@@ -0,0 +1,48 @@
+import sys
+import sqlite3
+from config.database import DB_PATH
+from utils.embedding_utils import encode_embedding, decode_embedding
+
+
+# One-shot migration of chunks.embedding from JSON text to binary BLOBs.
+# Usage: python migrate_embeddings.py [float32|float16]
+def migrate_embeddings(storage="float32", batch_size=500):
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "SELECT id FROM chunks WHERE typeof(embedding) = 'text' ORDER BY id"
+        )
+        chunk_ids = [r[0] for r in cursor.fetchall()]
+
+        for start in range(0, len(chunk_ids), batch_size):
+            batch = chunk_ids[start : start + batch_size]
+            placeholders = ",".join(["?"] * len(batch))
+            cursor.execute(
+                f"SELECT id, embedding FROM chunks WHERE id IN ({placeholders})",
+                batch,
+            )
+            cursor.executemany(
+                "UPDATE chunks SET embedding = ? WHERE id = ?",
+                [
+                    (encode_embedding(decode_embedding(emb), storage), cid)
+                    for cid, emb in cursor.fetchall()
+                ],
+            )
+            conn.commit()
+            done = min(start + batch_size, len(chunk_ids))
+            print(f"Migrated {done}/{len(chunk_ids)} chunks")
+
+        # give the space freed by the JSON text back to the filesystem
+        conn.execute("VACUUM")
+        print(f"Embeddings stored as {storage} BLOBs")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    migrate_embeddings(sys.argv[1] if len(sys.argv) > 1 else "float32")
@@ -1,4 +1,100 @@
-from sentence_transformers import SentenceTransformer
+import os
+import threading
 
-model = SentenceTransformer("intfloat/multilingual-e5-large")
+model_name = "intfloat/multilingual-e5-large"
 dimension = 1024
+
+# inference backend: torch, onnx (ONNX Runtime, fp32) or onnx_int8 (ONNX Runtime
+# with dynamic int8 quantization). The onnx ones need
+# `pip install "sentence-transformers[onnx]"`
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+# intra-op threads per process; 0 keeps the library default (all cores). With
+# several ingestion workers or gunicorn processes, cores / processes avoids
+# oversubscription
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+# instruction set the int8 export is tuned for: arm64, avx2, avx512 or avx512_vnni
+EMBEDDING_QUANT_CONFIG = os.getenv("EMBEDDING_QUANT_CONFIG", "avx2")
+# where the quantized export is written once and reused afterwards
+onnx_dir = os.getenv(
+    "EMBEDDING_ONNX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx", "e5-large"),
+)
+embedding_backends = ("torch", "onnx", "onnx_int8")
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def onnx_session_kwargs():
+    if not EMBEDDING_THREADS:
+        return {}
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = EMBEDDING_THREADS
+    options.inter_op_num_threads = 1
+    return {"session_options": options}
+
+
+# export the model to ONNX and quantize it to int8 on first use; later loads
+# read the saved file
+def load_int8_model():
+    from sentence_transformers import (
+        SentenceTransformer,
+        export_dynamic_quantized_onnx_model,
+    )
+
+    file_name = f"onnx/model_qint8_{EMBEDDING_QUANT_CONFIG}.onnx"
+    if not os.path.exists(os.path.join(onnx_dir, file_name)):
+        print(f"[INFO] Exporting {model_name} to int8 ONNX in {onnx_dir}")
+        fp32_model = SentenceTransformer(model_name, backend="onnx")
+        fp32_model.save(onnx_dir)
+        export_dynamic_quantized_onnx_model(
+            fp32_model, EMBEDDING_QUANT_CONFIG, onnx_dir
+        )
+        del fp32_model
+
+    return SentenceTransformer(
+        onnx_dir,
+        backend="onnx",
+        model_kwargs={"file_name": file_name, **onnx_session_kwargs()},
+    )
+
+
+def load_model(backend):
+    if backend not in embedding_backends:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx_int8":
+        return load_int8_model()
+    if backend == "onnx":
+        return SentenceTransformer(
+            model_name, backend="onnx", model_kwargs=onnx_session_kwargs()
+        )
+
+    if EMBEDDING_THREADS:
+        import torch
+
+        torch.set_num_threads(EMBEDDING_THREADS)
+    return SentenceTransformer(model_name)
+
+
+# load the model on first use; importing sentence_transformers pulls in torch,
+# so it stays out of module import
+def get_model():
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = load_model(EMBEDDING_BACKEND)
+                print(
+                    f"[INFO] Loaded embedding model {model_name} "
+                    f"({EMBEDDING_BACKEND} backend)"
+                )
+    return _model
+
+
+def model_loaded():
+    return _model is not None
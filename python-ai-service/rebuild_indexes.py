@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import numpy as np
+import faiss
+from config.database import DB_PATH, ensure_schema
+from utils.embedding_utils import decode_embedding
+from utils.minhash_utils import decode_signature, lsh_rows
+from utils.faiss_utils import (
+    FAISS_INDEX_TYPE,
+    build_index,
+    drop_all_shards,
+    get_shard,
+    write_shard,
+    index_kinds,
+    legacy_index_files,
+)
+
+
+# Rebuild every per-course FAISS shard from the embeddings stored in the chunks
+# table and renumber every chunk with dense sequential ids (replaces legacy random
+# ids). Also rewrites the memory-mapped vector stores next to the shard files and
+# builds the layout selected by FAISS_INDEX_TYPE. Replaces the unsharded
+# faiss_course.index / faiss_submission.index, which can be deleted afterwards.
+# Stop the service before running: it rewrites the index files in place.
+def rebuild_indexes():
+    ensure_schema()
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            """
+            SELECT c.id, c.embedding, m.submissionId IS NOT NULL, m.courseId, c.minhash
+            FROM chunks c JOIN materials m ON m.id = c.materialId
+            WHERE c.embedding IS NOT NULL
+            ORDER BY c.id
+            """
+        )
+        rows = cursor.fetchall()
+
+        targets = {}
+        updates = []
+        buckets = []
+        for new_id, row in enumerate(rows, 1):
+            chunk_id, embedding, is_submission, course_id, minhash = row
+            kind = "submission" if is_submission else "course"
+            ids, embeddings = targets.setdefault((kind, course_id), ([], []))
+            ids.append(new_id)
+            embeddings.append(decode_embedding(embedding))
+            updates.append((new_id, chunk_id))
+            if minhash is not None:
+                buckets.extend(lsh_rows(new_id, decode_signature(minhash)))
+
+        cursor.executemany("UPDATE chunks SET faissId = ? WHERE id = ?", updates)
+        # LSH buckets are keyed by faissId, so they follow the renumbering
+        cursor.execute("DELETE FROM chunk_lsh")
+        cursor.executemany(
+            "INSERT INTO chunk_lsh (band, bucket, faissId) VALUES (?, ?, ?)", buckets
+        )
+        # stored neighbor pairs name the old ids; every material recomputes them
+        # on its next scan
+        cursor.execute("DELETE FROM chunk_neighbors")
+        cursor.execute("UPDATE materials SET neighborsReady = 0")
+        cursor.execute(
+            "INSERT OR REPLACE INTO faiss_id_sequence (name, nextId) VALUES ('chunks', ?)",
+            (len(rows) + 1,),
+        )
+
+        for kind in index_kinds:
+            drop_all_shards(kind)
+
+        for (kind, course_id), (ids, embeddings) in targets.items():
+            vectors = np.stack(embeddings).astype(np.float32)
+            faiss.normalize_L2(vectors)
+            ids_array = np.array(ids, dtype=np.int64)
+
+            shard = get_shard(kind, course_id)
+            shard.index = build_index(FAISS_INDEX_TYPE, vectors, ids_array)
+            shard.store.add(ids_array, vectors)
+            write_shard(shard)
+            print(f"Rebuilt {kind} shard {course_id} with {len(ids)} vectors")
+
+        for path in legacy_index_files:
+            if os.path.exists(path):
+                print(f"{path} is no longer used and can be deleted")
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    rebuild_indexes()
@@ -1,19 +1,14 @@
 from flask import Blueprint, request, jsonify
 import sqlite3
-import os
-import json
 import numpy as np
-import faiss
-from datetime import datetime, timezone
-from utils.file_utils import download_file
-from utils.text_utils import extract_text, recursive_chunk
-from models.embedding import model
 from config.database import DB_PATH
+from utils.job_queue import enqueue_job
 from utils.faiss_utils import (
-    faiss_course_index,
-    course_index_file,
-    faiss_submission_index,
-    submission_index_file,
+    index_lock,
+    remove_vectors,
+    save_index,
+    drop_shard,
+    drop_all_shards,
 )
 
 course_bp = Blueprint("course", __name__)
@@ -81,98 +76,37 @@ def process_material(material_id):
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
-    cursor.execute("SELECT s3_url FROM materials WHERE id = ?", (material_id,))
-    row = cursor.fetchone()
-    if not row:
+    try:
+        cursor.execute("SELECT s3_url FROM materials WHERE id = ?", (material_id,))
+        row = cursor.fetchone()
+    finally:
         conn.close()
-        return jsonify({"success": False, "error": "Material not found"}), 404
 
-    file_url = row[0]
-    if not file_url:
-        conn.close()
+    if not row:
+        return jsonify({"success": False, "error": "Material not found"}), 404
+    if not row[0]:
         return jsonify({"success": False, "error": "No file URL in material"}), 400
 
-    cursor.execute(
-        "UPDATE materials SET processingStatus = ? WHERE id = ?",
-        ("processing", material_id),
-    )
-    conn.commit()
-
     try:
-        local_path = download_file(file_url)
-        text = extract_text(local_path)
-        chunks = recursive_chunk(text, chunk_size=500, chunk_overlap=50)
-        chunk_inputs = [f"passage: {c}" for c in chunks]
-        embeddings = model.encode(chunk_inputs, convert_to_numpy=True).astype(
-            np.float32
-        )
-        faiss.normalize_L2(embeddings)
-
-        for chunk_text, embedding in zip(chunks, embeddings):
-            faiss_id = np.random.randint(1, 1 << 60, dtype=np.int64)
-            faiss_course_index.add_with_ids(
-                embedding.reshape(1, -1), np.array([faiss_id], dtype=np.int64)
-            )
-            cursor.execute(
-                """
-                INSERT INTO chunks (materialId, text, embedding, faissId, createdAt)
-                VALUES (?, ?, ?, ?, ?)
-                """,
-                (
-                    material_id,
-                    chunk_text,
-                    json.dumps(embedding.tolist()),
-                    int(faiss_id),
-                    datetime.now(timezone.utc).isoformat(),
-                ),
-            )
-
-        cursor.execute(
-            """
-            UPDATE materials
-            SET processingStatus = ?, chunkCount = ?, extractedTextLength = ?
-            WHERE id = ?
-            """,
-            ("done", len(chunks), len(text), material_id),
+        job_id = enqueue_job(material_id, "course")
+    except Exception as e:
+        print(f"[ERROR] process_material: {e}")
+        return (
+            jsonify({"success": False, "materialId": material_id, "error": str(e)}),
+            500,
         )
-        conn.commit()
-        faiss.write_index(faiss_course_index, course_index_file)
 
-        try:
-            os.unlink(local_path)
-        except FileNotFoundError:
-            pass
-
-        return jsonify(
+    return (
+        jsonify(
             {
                 "success": True,
                 "materialId": material_id,
-                "status": "done",
-                "numChunks": len(chunks),
-                "embeddingShape": embeddings.shape,
+                "jobId": job_id,
+                "status": "pending",
             }
-        )
-
-    except Exception as e:
-        conn.rollback()
-        cursor.execute(
-            "UPDATE materials SET processingStatus = ? WHERE id = ?",
-            ("error", material_id),
-        )
-        conn.commit()
-        return (
-            jsonify(
-                {
-                    "success": False,
-                    "materialId": material_id,
-                    "error": str(e),
-                }
-            ),
-            500,
-        )
-
-    finally:
-        conn.close()
+        ),
+        202,
+    )
 
 
 # get materials by course
@@ -230,9 +164,12 @@ def delete_material(material_id):
 
     try:
         # Get s3_key (if stored)
-        cursor.execute("SELECT s3_key FROM materials WHERE id = ?", (material_id,))
+        cursor.execute(
+            "SELECT s3_key, courseId FROM materials WHERE id = ?", (material_id,)
+        )
         s3_row = cursor.fetchone()
         s3_key = s3_row[0] if s3_row and s3_row[0] else None
+        course_id = s3_row[1] if s3_row else None
 
         # Get FAISS IDs from chunks
         cursor.execute(
@@ -245,8 +182,9 @@ def delete_material(material_id):
         # Remove from FAISS index
         if faiss_ids:
             ids_array = np.array(faiss_ids, dtype=np.int64)
-            faiss_course_index.remove_ids(ids_array)
-            faiss.write_index(faiss_course_index, course_index_file)
+            with index_lock:
+                remove_vectors("course", course_id, ids_array)
+                save_index("course", course_id)
 
         # Delete chunks and material in DB
         cursor.execute("DELETE FROM chunks WHERE materialId = ?", (material_id,))
@@ -303,10 +241,7 @@ def delete_course(course_id):
             chunk_rows = cursor.fetchall()
             faiss_ids = [r[0] for r in chunk_rows if r[0] is not None]
 
-            if faiss_ids:
-                ids_array = np.array(faiss_ids, dtype=np.int64)
-                faiss_course_index.remove_ids(ids_array)
-                total_embeddings += len(faiss_ids)
+            total_embeddings += len(faiss_ids)
 
             # Count chunks before delete
             cursor.execute(
@@ -322,9 +257,10 @@ def delete_course(course_id):
         cursor.execute("DELETE FROM materials WHERE courseId = ?", (course_id,))
         mats_deleted = cursor.rowcount
 
-        # Commit and save FAISS index
+        # Commit and drop the course's FAISS shards (materials and submissions)
         conn.commit()
-        faiss.write_index(faiss_course_index, course_index_file)
+        drop_shard("course", course_id)
+        drop_shard("submission", course_id)
 
         return jsonify(
             {
@@ -347,7 +283,6 @@ def delete_course(course_id):
 
 @course_bp.route("/delete_all_courses", methods=["DELETE"])
 def delete_all_courses():
-    global faiss_course_index, faiss_submission_index
     conn = sqlite3.connect(DB_PATH)
     conn.execute("PRAGMA foreign_keys = ON;")
     cursor = conn.cursor()
@@ -361,13 +296,9 @@ def delete_all_courses():
         cursor.execute("DELETE FROM materials")
         conn.commit()
 
-        faiss_course_index.reset()
-        faiss_submission_index.reset()
-        print("Reset FAISS course & submission indexes")
-
-        faiss.write_index(faiss_course_index, course_index_file)
-        faiss.write_index(faiss_submission_index, submission_index_file)
-        print("Saved empty FAISS indexes back to file")
+        drop_all_shards("course")
+        drop_all_shards("submission")
+        print("Dropped all FAISS course & submission shards")
 
         return jsonify(
             {
@@ -0,0 +1,59 @@
+from flask import Blueprint, request, jsonify
+from utils.job_queue import workers_alive
+from utils.embedding_batcher import embedding_batcher
+from utils.web_cache import cache_stats
+from utils.memory_cache import memory_cache_stats
+from utils.plagiarism_utils import cascade_stats
+from utils.warmup_utils import warm_up, warmup_state, readiness
+
+health_bp = Blueprint("health", __name__)
+
+
+# liveness: the process answers, nothing is loaded
+@health_bp.route("/health", methods=["GET"])
+def health():
+    return jsonify(
+        {
+            "success": True,
+            "status": "ok",
+            "workers": workers_alive(),
+            "embedding": embedding_batcher.stats(),
+            "webCache": cache_stats(),
+            "memoryCaches": memory_cache_stats(),
+            "onlineCascade": cascade_stats(),
+        }
+    )
+
+
+# readiness: 503 until the models are loaded and the database is reachable
+@health_bp.route("/ready", methods=["GET"])
+def ready():
+    is_ready, checks = readiness()
+    return (
+        jsonify(
+            {
+                "success": is_ready,
+                "ready": is_ready,
+                "checks": checks,
+                "warmup": warmup_state,
+            }
+        ),
+        200 if is_ready else 503,
+    )
+
+
+# load the models now; optional {"courseIds": [...]} also loads those FAISS shards
+@health_bp.route("/warmup", methods=["POST"])
+def warmup():
+    data = request.get_json(silent=True) or {}
+    course_ids = data.get("courseIds") or []
+    if not isinstance(course_ids, list):
+        return jsonify({"success": False, "error": "courseIds must be a list"}), 400
+
+    try:
+        state = warm_up(course_ids)
+    except Exception as e:
+        print(f"[ERROR] warmup: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    return jsonify({"success": True, "warmup": state})
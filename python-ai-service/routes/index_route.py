@@ -0,0 +1,61 @@
+from flask import Blueprint, request, jsonify
+from utils.faiss_utils import (
+    index_kinds,
+    list_shards,
+    loaded_shards,
+    shard_exists,
+    index_info,
+    tune_index,
+    retrain_index,
+)
+
+index_bp = Blueprint("index", __name__)
+
+
+# every FAISS shard per kind, and whether it is loaded in this process
+@index_bp.route("/index_info", methods=["GET"])
+def get_index_info():
+    return jsonify(
+        {
+            "success": True,
+            "shards": {
+                kind: [
+                    {"courseId": cid, "loaded": (kind, cid) in loaded_shards}
+                    for cid in list_shards(kind)
+                ]
+                for kind in index_kinds
+            },
+        }
+    )
+
+
+# layout, size and search parameters of one shard
+@index_bp.route("/index_info/<kind>/<course_id>", methods=["GET"])
+def get_shard_info(kind, course_id):
+    if kind not in index_kinds or not shard_exists(kind, course_id):
+        return jsonify({"success": False, "error": "Unknown shard"}), 404
+
+    return jsonify({"success": True, "index": index_info(kind, course_id)})
+
+
+# tune nprobe (IVF) / efSearch (HNSW) at runtime without rebuilding
+@index_bp.route("/index_params", methods=["POST"])
+def set_index_params():
+    data = request.get_json() or {}
+    tune_index(nprobe=data.get("nprobe"), ef_search=data.get("efSearch"))
+    return jsonify({"success": True, "loadedShards": len(loaded_shards)})
+
+
+# rebuild one shard from its stored vectors, optionally switching layout
+@index_bp.route("/retrain_index/<kind>/<course_id>", methods=["POST"])
+def retrain(kind, course_id):
+    if kind not in index_kinds or not shard_exists(kind, course_id):
+        return jsonify({"success": False, "error": "Unknown shard"}), 404
+
+    data = request.get_json(silent=True) or {}
+    try:
+        retrain_index(kind, course_id, data.get("type"))
+        return jsonify({"success": True, "index": index_info(kind, course_id)})
+    except Exception as e:
+        print(f"[ERROR] retrain_index: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
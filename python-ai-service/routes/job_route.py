@@ -0,0 +1,65 @@
+from flask import Blueprint, jsonify
+import sqlite3
+from config.database import DB_PATH
+from utils.job_queue import get_material_status
+
+job_bp = Blueprint("job", __name__)
+
+
+# processing progress of one material
+@job_bp.route("/processing_status/<int:material_id>", methods=["GET"])
+def processing_status(material_id):
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        materials = get_material_status(cursor, "m.id = ?", (material_id,))
+        if not materials:
+            return jsonify({"success": False, "error": "Material not found"}), 404
+
+        return jsonify({"success": True, "material": materials[0]})
+    except Exception as e:
+        print(f"[ERROR] processing_status: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+    finally:
+        conn.close()
+
+
+# processing progress of every material in a submission
+@job_bp.route("/processing_status/submission/<submission_id>", methods=["GET"])
+def submission_processing_status(submission_id):
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        materials = get_material_status(cursor, "m.submissionId = ?", (submission_id,))
+        if not materials:
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "message": "No materials found for this submission",
+                    }
+                ),
+                404,
+            )
+
+        done = sum(1 for m in materials if m["processingStatus"] == "done")
+        failed = sum(1 for m in materials if m["processingStatus"] == "error")
+
+        return jsonify(
+            {
+                "success": True,
+                "submission_id": submission_id,
+                "materials": materials,
+                "total": len(materials),
+                "done": done,
+                "error": failed,
+                "finished": done + failed == len(materials),
+            }
+        )
+    except Exception as e:
+        print(f"[ERROR] submission_processing_status: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+    finally:
+        conn.close()
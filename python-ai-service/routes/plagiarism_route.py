@@ -1,22 +1,29 @@
-from flask import jsonify, Blueprint
-from utils.plagiarism_utils import check_plagiarism_material
+from flask import jsonify, request, Blueprint
+from utils.plagiarism_utils import (
+    check_plagiarism_material,
+    extract_submission_keywords,
+)
 import numpy as np
 import sqlite3
 from config.database import DB_PATH
+from utils.job_queue import get_material_status
 
 plagiarism_bp = Blueprint("plagiarism", __name__)
 
 
 @plagiarism_bp.route("/check_plagiarism/<submission_id>", methods=["GET"])
 def check_plagiarism(submission_id):
+    # "course" (default) compares against the submission's course only
+    scope = request.args.get("scope", "course")
+    if scope not in ("course", "global"):
+        return jsonify({"success": False, "message": "Invalid scope"}), 400
+
     try:
         conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
-        cursor.execute(
-            "SELECT id, title FROM materials WHERE submissionId = ?", (submission_id,)
-        )
-        material_rows = cursor.fetchall()
+        materials = get_material_status(cursor, "m.submissionId = ?", (submission_id,))
         conn.close()
+        material_rows = [(m["materialId"], m["title"]) for m in materials]
 
         if not material_rows:
             return (
@@ -29,11 +36,40 @@ def check_plagiarism(submission_id):
                 404,
             )
 
+        # ingestion runs in the background; while a material still has a queued or
+        # running job the database half of the report would be empty or partial
+        processing = [
+            m
+            for m in materials
+            if m["job"] and m["job"]["status"] in ("queued", "running")
+        ]
+        if processing:
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "status": "processing",
+                        "message": "Submission is still being processed",
+                        "submission_id": submission_id,
+                        "materials": materials,
+                        "total": len(materials),
+                        "pending": len(processing),
+                    }
+                ),
+                202,
+            )
+
+        # keywords of all materials in one batched pass before the online scans
+        try:
+            extract_submission_keywords([mid for mid, _ in material_rows])
+        except Exception as e:
+            print(f"[WARN] Batched keyword extraction failed: {e}")
+
         files_result = []
 
         for mid, title in material_rows:
             try:
-                res = check_plagiarism_material(mid)
+                res = check_plagiarism_material(mid, scope=scope)
                 online = res.get("online", [])
                 database = res.get("database", [])
             except Exception as e:
@@ -62,6 +98,7 @@ def check_plagiarism(submission_id):
                         "similarity": sim,
                         "sourceType": "external",
                         "sourceId": match.get("url"),
+                        "matchedSpans": match.get("matchedSpans", []),
                     }
 
             for match in database:
@@ -78,6 +115,7 @@ def check_plagiarism(submission_id):
                         "similarity": sim,
                         "sourceType": "internal",
                         "sourceId": str(match.get("neighborMaterialId")),
+                        "matchedSpans": match.get("matchedSpans", []),
                     }
 
             matched_sources = []
@@ -97,6 +135,7 @@ def check_plagiarism(submission_id):
                         "similarity": 0.0,
                         "sourceType": None,
                         "sourceId": None,
+                        "matchedSpans": [],
                     }
 
                 best["similarity"] = float(best["similarity"])
@@ -1,14 +1,9 @@
 from flask import Blueprint, request, jsonify
 import sqlite3
 import numpy as np
-import json
-import os
-import faiss
 from config.database import DB_PATH
-from utils.file_utils import download_file
-from utils.text_utils import extract_text, recursive_chunk
-from models.embedding import model
-from utils.faiss_utils import faiss_submission_index, submission_index_file
+from utils.job_queue import enqueue_job
+from utils.faiss_utils import index_lock, remove_vectors, save_index, drop_all_shards
 
 submission_bp = Blueprint("submission", __name__)
 
@@ -134,80 +129,25 @@ def process_submission():
                 continue
 
             s3_url, title = row
-
-            cursor.execute(
-                "UPDATE materials SET processingStatus='processing' WHERE id=?",
-                (material_id,),
-            )
-            conn.commit()
-
-            local_path = download_file(s3_url)
-            text = extract_text(local_path)
-
-            chunks = recursive_chunk(text, chunk_size=500, chunk_overlap=50)
-            chunk_inputs = [f"passage: {c}" for c in chunks]
-            embeddings = model.encode(chunk_inputs, convert_to_numpy=True).astype(
-                np.float32
-            )
-
-            faiss.normalize_L2(embeddings)
-
-            for chunk_text, embedding in zip(chunks, embeddings):
-                faiss_id = np.random.randint(1, 1 << 60, dtype=np.int64)
-                faiss_submission_index.add_with_ids(
-                    embedding.reshape(1, -1),
-                    np.array([faiss_id], dtype=np.int64),
-                )
-
-                cursor.execute(
-                    """
-                    INSERT INTO chunks (materialId, faissId, text, embedding)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    (
-                        material_id,
-                        int(faiss_id),
-                        chunk_text,
-                        json.dumps(embedding.tolist()),
-                    ),
-                )
-
-            cursor.execute(
-                """
-                UPDATE materials
-                SET submissionId=?, processingStatus='done',
-                    chunkCount=?, extractedTextLength=?
-                WHERE id=?
-                """,
-                (submission_id, len(chunks), len(text), material_id),
-            )
-
-            conn.commit()
-
-            # cleanup local file
-            try:
-                os.unlink(local_path)
-            except FileNotFoundError:
-                pass
+            job_id = enqueue_job(material_id, "submission", submission_id)
 
             results.append(
                 {
                     "materialId": material_id,
                     "title": title,
-                    "numChunks": len(chunks),
-                    "status": "done",
+                    "jobId": job_id,
+                    "status": "pending",
                 }
             )
 
-        # write FAISS index
-        faiss.write_index(faiss_submission_index, submission_index_file)
-
-        return jsonify(
-            {"success": True, "submission_id": submission_id, "results": results}
+        return (
+            jsonify(
+                {"success": True, "submission_id": submission_id, "results": results}
+            ),
+            202,
         )
 
     except Exception as e:
-        conn.rollback()
         print(f"[ERROR] process_submission: {e}")
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -241,12 +181,22 @@ def delete_submission(submission_id):
             )
 
         cursor.execute(
-            f"SELECT faissId FROM chunks WHERE materialId IN ({','.join(['?']*len(material_ids))})",
+            f"""
+            SELECT c.faissId, m.courseId
+            FROM chunks c JOIN materials m ON m.id = c.materialId
+            WHERE c.materialId IN ({','.join(['?']*len(material_ids))})
+            """,
             material_ids,
         )
         chunk_rows = cursor.fetchall()
         faiss_ids = [r[0] for r in chunk_rows if r[0] is not None]
 
+        # group ids by course shard
+        shard_ids = {}
+        for faiss_id, course_id in chunk_rows:
+            if faiss_id is not None:
+                shard_ids.setdefault(course_id, []).append(faiss_id)
+
         cursor.execute(
             f"DELETE FROM chunks WHERE materialId IN ({','.join(['?']*len(material_ids))})",
             material_ids,
@@ -256,10 +206,10 @@ def delete_submission(submission_id):
         cursor.execute("DELETE FROM materials WHERE submissionId = ?", (submission_id,))
         materials_deleted = cursor.rowcount
 
-        if faiss_ids:
-            ids_array = np.array(faiss_ids, dtype=np.int64)
-            faiss_submission_index.remove_ids(ids_array)
-            faiss.write_index(faiss_submission_index, submission_index_file)
+        with index_lock:
+            for course_id, ids in shard_ids.items():
+                remove_vectors("submission", course_id, np.array(ids, dtype=np.int64))
+                save_index("submission", course_id)
 
         conn.commit()
 
@@ -311,10 +261,7 @@ def delete_all_submissions():
         chunk_rows = cursor.fetchall()
         faiss_ids = [r[0] for r in chunk_rows if r[0] is not None]
 
-        if faiss_ids:
-            ids_array = np.array(faiss_ids, dtype=np.int64)
-            faiss_submission_index.remove_ids(ids_array)
-            faiss.write_index(faiss_submission_index, submission_index_file)
+        drop_all_shards("submission")
 
         cursor.execute("DELETE FROM materials WHERE submissionId IS NOT NULL")
         deleted_materials = cursor.rowcount
@@ -0,0 +1,136 @@
+import os
+import re
+import numpy as np
+from utils.text_utils import punctuation
+
+# Seed-and-extend alignment of a chunk against many snippets at once. Texts are
+# compared word by word after the normalization of normalize_text (lowercase,
+# punctuation dropped); every run of at least ALIGN_MIN_WORDS equal words is a
+# match. Seeds are rolling hashes of ALIGN_MIN_WORDS-word windows, matched with
+# one sort and binary search, and runs of consecutive seeds on one diagonal are
+# the extended matches, so the cost is about linear in the text lengths.
+ALIGN_MIN_WORDS = int(os.getenv("ALIGN_MIN_WORDS", "4"))
+
+_word = re.compile(r"\S+")
+_base = np.uint64(1099511628211)
+
+
+# the words of normalize_text with their character offsets in the original
+def tokenize(text):
+    words, starts, ends = [], [], []
+    for m in _word.finditer(text or ""):
+        word = punctuation.sub("", m.group().lower())
+        if word:
+            words.append(word)
+            starts.append(m.start())
+            ends.append(m.end())
+    return words, starts, ends
+
+
+def _word_ids(words):
+    return np.array([hash(w) for w in words], dtype=np.int64).view(np.uint64)
+
+
+# hash of every k-word window
+def _seeds(ids, k):
+    n = len(ids) - k + 1
+    if n <= 0:
+        return np.zeros(0, dtype=np.uint64)
+    h = np.zeros(n, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for m in range(k):
+            h = h * _base + ids[m : m + n]
+    return h
+
+
+def _normalized_length(words):
+    return sum(len(w) for w in words) + max(len(words) - 1, 0)
+
+
+# one (score, spans) per snippet. score is 2 * matched / (len(text) + len(snippet))
+# over the normalized characters, like SequenceMatcher.ratio() but counting only
+# runs of whole words. spans are (textStart, textEnd, snippetStart, snippetEnd)
+# character offsets into the original strings, in text order
+def align_snippets(text, snippets, min_words=None):
+    k = min_words or ALIGN_MIN_WORDS
+    words, starts, ends = tokenize(text)
+    results = [(0.0, []) for _ in snippets]
+    if len(words) < k or not snippets:
+        return results
+
+    text_ids = _word_ids(words)
+    text_seeds = _seeds(text_ids, k)
+    order = np.argsort(text_seeds, kind="stable")
+    sorted_seeds = text_seeds[order]
+    text_length = _normalized_length(words)
+
+    # all snippets as one word array; a window may not cross a snippet boundary
+    snippet_tokens = [tokenize(s) for s in snippets]
+    lengths = np.array([len(t[0]) for t in snippet_tokens], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    all_words = [w for t in snippet_tokens for w in t[0]]
+    if len(all_words) < k:
+        return results
+    all_seeds = _seeds(_word_ids(all_words), k)
+    positions = np.arange(len(all_seeds))
+    owner = np.searchsorted(offsets, positions, side="right") - 1
+    inside = positions + k <= offsets[owner + 1]
+
+    # every (text window, snippet window) pair with the same hash
+    left = np.searchsorted(sorted_seeds, all_seeds, side="left")
+    right = np.searchsorted(sorted_seeds, all_seeds, side="right")
+    counts = np.where(inside, right - left, 0)
+    if not counts.any():
+        return results
+    snippet_pos = np.repeat(positions, counts)
+    first = np.repeat(left, counts)
+    within = np.arange(len(snippet_pos)) - np.repeat(np.cumsum(counts) - counts, counts)
+    text_pos = order[first + within]
+
+    # consecutive seeds on one diagonal form a run of equal words
+    diagonal = snippet_pos - text_pos
+    hit_order = np.lexsort((text_pos, diagonal))
+    diagonal, text_pos, snippet_pos = (
+        diagonal[hit_order],
+        text_pos[hit_order],
+        snippet_pos[hit_order],
+    )
+    breaks = np.flatnonzero(
+        (np.diff(diagonal) != 0) | (np.diff(text_pos) != 1)
+    ) + 1
+    run_starts = np.concatenate([[0], breaks])
+    run_ends = np.concatenate([breaks, [len(text_pos)]])
+    runs_text = text_pos[run_starts]
+    runs_snippet = snippet_pos[run_starts]
+    runs_words = run_ends - run_starts + k - 1
+    runs_owner = owner[runs_snippet]
+
+    # per snippet, keep the longest runs that overlap no kept run (greedy,
+    # as SequenceMatcher takes the longest block first)
+    for s in np.unique(runs_owner):
+        mine = np.flatnonzero(runs_owner == s)
+        mine = mine[np.argsort(-runs_words[mine], kind="stable")]
+        s_words, s_starts, s_ends = snippet_tokens[s]
+        base = offsets[s]
+        used_text = np.zeros(len(words), dtype=bool)
+        used_snippet = np.zeros(len(s_words), dtype=bool)
+        spans = []
+        matched = 0
+        for r in mine:
+            t0, n = int(runs_text[r]), int(runs_words[r])
+            s0 = int(runs_snippet[r] - base)
+            if used_text[t0 : t0 + n].any() or used_snippet[s0 : s0 + n].any():
+                continue
+            used_text[t0 : t0 + n] = True
+            used_snippet[s0 : s0 + n] = True
+            matched += _normalized_length(words[t0 : t0 + n])
+            spans.append(
+                (starts[t0], ends[t0 + n - 1], s_starts[s0], s_ends[s0 + n - 1])
+            )
+        total = text_length + _normalized_length(s_words)
+        results[s] = (2.0 * matched / total if total else 0.0, sorted(spans))
+    return results
+
+
+def align(text1, text2, min_words=None):
+    return align_snippets(text1, [text2], min_words)[0]
@@ -0,0 +1,23 @@
+# SQLite caps the number of bound parameters per statement
+sql_batch_size = 900
+
+
+# metadata of many chunks with one set-based query per batch of ids;
+# returns {faissId: (text, materialId, courseId, ownerType)}
+def fetch_chunk_metadata(cursor, faiss_ids):
+    faiss_ids = [int(i) for i in faiss_ids]
+    metadata = {}
+    for start in range(0, len(faiss_ids), sql_batch_size):
+        batch = faiss_ids[start : start + sql_batch_size]
+        placeholders = ",".join(["?"] * len(batch))
+        cursor.execute(
+            f"""
+            SELECT c.faissId, c.text, c.materialId, m.courseId, m.ownerType
+            FROM chunks c JOIN materials m ON m.id = c.materialId
+            WHERE c.faissId IN ({placeholders})
+            """,
+            batch,
+        )
+        for faiss_id, text, n_material_id, course_id, owner_type in cursor.fetchall():
+            metadata[faiss_id] = (text, n_material_id, course_id, owner_type)
+    return metadata
@@ -0,0 +1,135 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+from models.embedding import get_model, dimension
+
+# encode requests from every thread are merged into batches of up to this many
+# texts; the first request waits at most EMBED_MAX_WAIT_MS for company
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "64"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+
+
+class EmbeddingBatcher:
+    def __init__(self, max_batch=EMBED_MAX_BATCH, max_wait_ms=EMBED_MAX_WAIT_MS):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000
+        self.pending = deque()
+        self.pending_texts = 0
+        self.cond = threading.Condition()
+        self.thread = None
+        self.batches = 0
+        self.texts = 0
+
+    # queue texts for encoding; the future resolves to a float32 (n, dimension) array
+    def submit(self, texts):
+        texts = list(texts)
+        future = Future()
+        if not texts:
+            future.set_result(np.zeros((0, dimension), dtype=np.float32))
+            return future
+
+        with self.cond:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="embedding-batcher", daemon=True
+                )
+                self.thread.start()
+            # texts, offset of the next slice to encode, encoded slices, future
+            self.pending.append([texts, 0, [], future])
+            self.pending_texts += len(texts)
+            self.cond.notify()
+        return future
+
+    def encode(self, texts):
+        return self.submit(texts).result()
+
+    # wait for work, then for the batch to fill up or the wait time to run out
+    def take(self):
+        with self.cond:
+            while not self.pending:
+                self.cond.wait()
+            deadline = time.monotonic() + self.max_wait
+            while self.pending_texts < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+
+            # a request larger than the room left is sliced and the rest goes to the
+            # back of the queue, so a large ingest does not hold up the requests
+            # behind it
+            slices, count = [], 0
+            while self.pending and count < self.max_batch:
+                request = self.pending.popleft()
+                texts, start, _, future = request
+                if future.done():
+                    # cancelled, or an earlier slice failed
+                    self.pending_texts -= len(texts) - start
+                    continue
+                end = min(len(texts), start + self.max_batch - count)
+                slices.append((request, texts[start:end]))
+                request[1] = end
+                count += end - start
+                if end < len(texts):
+                    self.pending.append(request)
+            self.pending_texts -= count
+            return slices
+
+    def run(self):
+        while True:
+            slices = self.take()
+            texts = [text for _, slice_texts in slices for text in slice_texts]
+            try:
+                embeddings = self.encode_sorted(texts)
+            except Exception as e:
+                for request, _ in slices:
+                    if not request[3].done():
+                        request[3].set_exception(e)
+                continue
+
+            start = 0
+            for request, slice_texts in slices:
+                end = start + len(slice_texts)
+                request_texts, _, parts, future = request
+                parts.append(embeddings[start:end])
+                start = end
+                if sum(len(part) for part in parts) == len(request_texts):
+                    if not future.done():
+                        future.set_result(np.concatenate(parts))
+
+    # texts of similar length share a model batch, so little padding is computed;
+    # character count stands in for token count
+    def encode_sorted(self, texts):
+        model = get_model()
+        order = np.argsort([len(t) for t in texts], kind="stable")
+        embeddings = np.empty((len(texts), dimension), dtype=np.float32)
+        for lo in range(0, len(texts), self.max_batch):
+            idx = order[lo : lo + self.max_batch]
+            embeddings[idx] = model.encode(
+                [texts[i] for i in idx],
+                batch_size=len(idx),
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            )
+            self.batches += 1
+        self.texts += len(texts)
+        return embeddings
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "meanBatchSize": round(self.texts / self.batches, 1) if self.batches else 0,
+            "pending": self.pending_texts,
+        }
+
+
+embedding_batcher = EmbeddingBatcher()
+
+
+# blocking encode through the shared batcher; use this instead of model.encode
+def embed_texts(texts):
+    return embedding_batcher.encode(texts)
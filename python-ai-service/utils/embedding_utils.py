@@ -0,0 +1,34 @@
+import os
+import json
+import numpy as np
+from models.embedding import dimension
+
+# storage precision for chunks.embedding: "float32" (default) or "float16" (half the size)
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32")
+
+storage_dtypes = {"float32": np.float32, "float16": np.float16}
+
+# query-side vector of a chunk in the online scan: "stored" reads the "query: "
+# embedding computed at ingest (chunks.queryEmbedding), "passage" reuses
+# chunks.embedding, "encode" runs the model during the scan
+QUERY_EMBEDDING_MODE = os.getenv("QUERY_EMBEDDING_MODE", "stored")
+
+
+# serialize a vector to the compact BLOB stored in chunks.embedding
+def encode_embedding(embedding, storage=None):
+    dtype = storage_dtypes[storage or EMBEDDING_STORAGE]
+    return np.asarray(embedding, dtype=dtype).tobytes()
+
+
+# decode a chunks.embedding value; float32 BLOBs are returned as a read-only
+# zero-copy view, float16 BLOBs and legacy JSON text are converted to float32
+def decode_embedding(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return np.array(json.loads(value), dtype=np.float32)
+    if len(value) == dimension * 4:
+        return np.frombuffer(value, dtype=np.float32)
+    if len(value) == dimension * 2:
+        return np.frombuffer(value, dtype=np.float16).astype(np.float32)
+    raise ValueError(f"Unexpected embedding size: {len(value)} bytes")
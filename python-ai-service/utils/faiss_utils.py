@@ -1,25 +1,433 @@
 import os
+import re
+import math
+import threading
+from collections import OrderedDict
 import faiss
+import numpy as np
 from models.embedding import dimension
+from utils.vector_store import VectorStore
+
+# index layout: flat (exact), ivf_flat, ivf_pq or hnsw (approximate search),
+# sq8, sqfp16 or pq (compressed storage, exhaustive search)
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+# IVF lists; 0 picks ~4*sqrt(n) at training time
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "0"))
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "64"))
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+# IVF/PQ indexes stay flat until this many vectors are available for training
+FAISS_MIN_TRAIN_SIZE = int(os.getenv("FAISS_MIN_TRAIN_SIZE", "10000"))
+# compressed layouts fetch this many times more candidates, re-ranked exactly
+FAISS_RERANK_FACTOR = int(os.getenv("FAISS_RERANK_FACTOR", "4"))
+
+# PQ trains 2^8 centroids per sub-quantizer and needs at least that many points
+pq_min_train_size = 256
+# layouts that must be trained, and the vectors needed before training them
+min_train_sizes = {
+    "ivf_flat": FAISS_MIN_TRAIN_SIZE,
+    "ivf_pq": max(FAISS_MIN_TRAIN_SIZE, pq_min_train_size),
+    "pq": max(FAISS_MIN_TRAIN_SIZE, pq_min_train_size),
+    "sq8": 1000,
+}
+trained_index_types = tuple(min_train_sizes)
+# layouts whose training failed in this process; their shards stay flat
+failed_index_types = set()
+# layouts whose distances are approximate and need exact re-ranking
+quantized_index_types = ("ivf_pq", "pq", "sq8", "sqfp16")
+
+
+def choose_nlist(ntotal):
+    if FAISS_NLIST:
+        return FAISS_NLIST
+    # ~4*sqrt(n) lists, keeping the 39 training points per centroid FAISS asks for
+    return max(1, min(int(4 * math.sqrt(ntotal)), ntotal // 39))
+
+
+def factory_string(index_type, ntotal):
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{choose_nlist(ntotal)},Flat"
+    if index_type == "ivf_pq":
+        return f"IVF{choose_nlist(ntotal)},PQ{FAISS_PQ_M}"
+    if index_type == "hnsw":
+        return f"HNSW{FAISS_HNSW_M},Flat"
+    if index_type == "sq8":
+        return "SQ8"
+    if index_type == "sqfp16":
+        return "SQfp16"
+    if index_type == "pq":
+        return f"PQ{FAISS_PQ_M}"
+    raise ValueError(f"Unknown FAISS index type: {index_type}")
+
+
+# the index that holds the vectors, below the IDMap wrapper if there is one
+def base_index(index):
+    return faiss.downcast_index(index.index if hasattr(index, "id_map") else index)
+
+
+# the layout key of a loaded index (inverse of factory_string)
+def index_type_of(index):
+    inner = base_index(index)
+    if isinstance(inner, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(inner, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(inner, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(inner, faiss.IndexPQ):
+        return "pq"
+    if isinstance(inner, faiss.IndexScalarQuantizer):
+        if inner.sq.qtype == faiss.ScalarQuantizer.QT_fp16:
+            return "sqfp16"
+        return "sq8"
+    return "flat"
+
+
+# search-time knobs; None leaves the current value untouched
+def set_search_params(index, nprobe=None, ef_search=None):
+    inner = base_index(index)
+    if isinstance(inner, faiss.IndexIVF) and nprobe is not None:
+        inner.nprobe = max(1, min(int(nprobe), inner.nlist))
+    elif isinstance(inner, faiss.IndexHNSW) and ef_search is not None:
+        inner.hnsw.efSearch = max(1, int(ef_search))
+
+
+# new index of the given layout, trained on and filled with `vectors`. IVF
+# layouts store the ids themselves; every other layout is wrapped in an IDMap.
+# Layouts that need training fall back to flat when there are too few vectors
+# or when training fails.
+def build_index(index_type, vectors=None, ids=None):
+    ntotal = 0 if vectors is None else len(vectors)
+    if index_type in trained_index_types and ntotal < min_train_sizes[index_type]:
+        index_type = "flat"
+
+    try:
+        inner = faiss.index_factory(dimension, factory_string(index_type, ntotal))
+        if not inner.is_trained:
+            inner.train(vectors)
+    except RuntimeError as e:
+        if index_type == "flat":
+            raise
+        print(f"[WARN] Training a {index_type} index failed, keeping flat: {e}")
+        failed_index_types.add(index_type)
+        inner = faiss.index_factory(dimension, factory_string("flat", ntotal))
+    # IDMap.remove_ids assumes the inner index shifts later ids down, which IVF
+    # lists do not; an IVF inside an IDMap maps searches to the wrong ids
+    if isinstance(faiss.downcast_index(inner), faiss.IndexIVF):
+        index = inner
+    else:
+        index = faiss.IndexIDMap(inner)
+    set_search_params(index, FAISS_NPROBE, FAISS_EF_SEARCH)
+    if ntotal:
+        index.add_with_ids(vectors, ids)
+    return index
 
 
 def load_or_create_faiss_index(index_file):
     if os.path.exists(index_file):
         idx = faiss.read_index(index_file)
         print(f"Loaded FAISS index from {index_file}")
-        if not isinstance(idx, faiss.IndexIDMap):
+        if not isinstance(idx, (faiss.IndexIDMap, faiss.IndexIVF)):
             idx = faiss.IndexIDMap(idx)
             print(f"Wrapped {index_file} with IDMap")
+        set_search_params(idx, FAISS_NPROBE, FAISS_EF_SEARCH)
     else:
-        base_index = faiss.IndexFlatL2(dimension)
-        idx = faiss.IndexIDMap(base_index)
+        idx = build_index(FAISS_INDEX_TYPE)
         print(f"Created new FAISS index with IDMap for {index_file}")
     return idx
 
 
+# reserve `count` consecutive ids; runs inside the caller's transaction so a rollback
+# gives the block back, and the caller must first remove any vectors it already
+# added under them. Ids are unique across the course and submission indexes.
+def allocate_faiss_ids(cursor, count):
+    cursor.execute(
+        """
+        INSERT OR IGNORE INTO faiss_id_sequence (name, nextId)
+        VALUES ('chunks', (SELECT COALESCE(MAX(faissId), 0) + 1 FROM chunks))
+        """
+    )
+    cursor.execute(
+        "UPDATE faiss_id_sequence SET nextId = nextId + ? WHERE name = 'chunks'",
+        (count,),
+    )
+    cursor.execute("SELECT nextId FROM faiss_id_sequence WHERE name = 'chunks'")
+    end = cursor.fetchone()[0]
+    return np.arange(end - count, end, dtype=np.int64)
+
+
 base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-course_index_file = os.path.join(base_dir, "faiss_course.index")
-submission_index_file = os.path.join(base_dir, "faiss_submission.index")
+# one shard per (kind, courseId): indexes/<kind>/<courseId>.index (+ .vectors/.ids)
+shards_dir = os.path.join(base_dir, "indexes")
+index_kinds = ("course", "submission")
+# shards kept in memory at once; the least recently used one is unloaded
+FAISS_MAX_LOADED_SHARDS = int(os.getenv("FAISS_MAX_LOADED_SHARDS", "64"))
+
+# monolithic indexes from before sharding; rebuild_indexes.py migrates them
+legacy_index_files = [
+    os.path.join(base_dir, f"faiss_{kind}.index") for kind in index_kinds
+]
+
+
+class Shard:
+    def __init__(self, kind, course_id):
+        self.kind = kind
+        self.course_id = course_id
+        prefix = shard_prefix(kind, course_id)
+        self.index_file = prefix + ".index"
+        self.store = VectorStore(prefix, dimension)
+        self.index = load_or_create_faiss_index(self.index_file)
+        self.mtime = file_mtime(self.index_file)
+        self.dirty = False
+        if isinstance(self.index, faiss.IndexIDMap) and isinstance(
+            base_index(self.index), faiss.IndexIVF
+        ):
+            unwrap_ivf(self)
+
+
+# IVF shards written inside an IDMap: refill the trained IVF from the vector
+# store under the real ids, since removals may have scrambled the IDMap's ids
+def unwrap_ivf(shard):
+    if len(shard.store) < shard.index.ntotal:
+        print(
+            f"[WARN] {shard.index_file} wraps an IVF index in an IDMap and its "
+            "vector store is incomplete; run rebuild_indexes.py"
+        )
+        return
+    inner = faiss.clone_index(base_index(shard.index))
+    inner.reset()
+    ids, vectors = shard.store.all()
+    if len(ids):
+        inner.add_with_ids(vectors, ids)
+    set_search_params(inner, FAISS_NPROBE, FAISS_EF_SEARCH)
+    shard.index = inner
+    shard.dirty = True
+    print(f"[INFO] Moved {shard.index_file} to native IVF ids")
+
+
+def shard_prefix(kind, course_id):
+    safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", str(course_id)) if course_id else "_none"
+    return os.path.join(shards_dir, kind, safe_id)
+
+
+def file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+# FAISS indexes are not safe for concurrent add/remove/search across threads
+index_lock = threading.RLock()
+loaded_shards = OrderedDict()
+
+
+# lazily load a shard, reloading it when another process rewrote its file
+def get_shard(kind, course_id):
+    key = (kind, course_id)
+    with index_lock:
+        shard = loaded_shards.get(key)
+        if shard is not None and not shard.dirty:
+            if file_mtime(shard.index_file) != shard.mtime:
+                shard = None
+        if shard is None:
+            os.makedirs(os.path.dirname(shard_prefix(kind, course_id)), exist_ok=True)
+            shard = Shard(kind, course_id)
+            loaded_shards[key] = shard
+        loaded_shards.move_to_end(key)
+
+        while len(loaded_shards) > FAISS_MAX_LOADED_SHARDS:
+            _, evicted = loaded_shards.popitem(last=False)
+            if evicted.dirty:
+                write_shard(evicted)
+        return shard
+
+
+def shard_exists(kind, course_id):
+    return (kind, course_id) in loaded_shards or os.path.exists(
+        shard_prefix(kind, course_id) + ".index"
+    )
+
+
+# course ids of every shard on disk or in memory
+def list_shards(kind):
+    course_ids = {cid for k, cid in loaded_shards if k == kind}
+    kind_dir = os.path.join(shards_dir, kind)
+    if os.path.isdir(kind_dir):
+        for file_name in os.listdir(kind_dir):
+            if file_name.endswith(".index"):
+                course_ids.add(file_name[: -len(".index")])
+    return sorted(course_ids)
+
+
+def write_shard(shard):
+    faiss.write_index(shard.index, shard.index_file)
+    shard.mtime = file_mtime(shard.index_file)
+    shard.dirty = False
+
+
+def get_index(kind, course_id):
+    return get_shard(kind, course_id).index
+
+
+def get_vector_store(kind, course_id):
+    return get_shard(kind, course_id).store
+
+
+def save_index(kind, course_id):
+    with index_lock:
+        write_shard(get_shard(kind, course_id))
+
+
+# rebuild a shard from its vector store, e.g. after switching FAISS_INDEX_TYPE
+# or once an IVF index has outgrown the number of lists it was trained with
+def retrain_index(kind, course_id, index_type=None, check_complete=True):
+    with index_lock:
+        shard = get_shard(kind, course_id)
+        if check_complete and not store_is_complete(shard):
+            raise ValueError(
+                f"Vector store of the {kind} shard {course_id} is incomplete; "
+                "run rebuild_indexes.py first"
+            )
+        ids, vectors = shard.store.all()
+        shard.index = build_index(index_type or FAISS_INDEX_TYPE, vectors, ids)
+        write_shard(shard)
+        print(
+            f"Retrained FAISS {kind} shard {course_id} as "
+            f"{index_type_of(shard.index)} with {shard.index.ntotal} vectors"
+        )
+        return shard.index
+
+
+# indexes written before the vector store existed hold vectors the store lacks
+def store_is_complete(shard):
+    return len(shard.store) >= shard.index.ntotal
+
+
+def needs_retrain(shard):
+    index = shard.index
+    current = index_type_of(index)
+    if current != FAISS_INDEX_TYPE:
+        # flat placeholder for a layout that was waiting for training data
+        if FAISS_INDEX_TYPE in failed_index_types:
+            return False
+        return (
+            FAISS_INDEX_TYPE not in trained_index_types
+            or index.ntotal >= min_train_sizes[FAISS_INDEX_TYPE]
+        )
+    if current in ("ivf_flat", "ivf_pq") and not FAISS_NLIST:
+        nlist = base_index(index).nlist
+        return choose_nlist(index.ntotal) >= 2 * nlist
+    return False
+
+
+def add_vectors(kind, course_id, ids, vectors):
+    with index_lock:
+        shard = get_shard(kind, course_id)
+        shard.index.add_with_ids(vectors, ids)
+        shard.store.add(ids, vectors)
+        shard.dirty = True
+        if needs_retrain(shard) and store_is_complete(shard):
+            retrain_index(kind, course_id)
+
+
+def remove_vectors(kind, course_id, ids):
+    ids = np.asarray(ids, dtype=np.int64)
+    with index_lock:
+        shard = get_shard(kind, course_id)
+        complete = store_is_complete(shard)
+        shard.store.remove(ids)
+        shard.dirty = True
+        try:
+            shard.index.remove_ids(ids)
+        except RuntimeError:
+            if not complete:
+                raise
+            # HNSW graphs cannot delete nodes; rebuild from the remaining vectors
+            retrain_index(
+                kind, course_id, index_type_of(shard.index), check_complete=False
+            )
+
+
+# delete a whole shard (index and vector store files) instead of remove_ids
+def drop_shard(kind, course_id):
+    with index_lock:
+        loaded_shards.pop((kind, course_id), None)
+        prefix = shard_prefix(kind, course_id)
+        for ext in (".index", ".vectors", ".ids", ".lock"):
+            try:
+                os.remove(prefix + ext)
+            except FileNotFoundError:
+                pass
+
+
+def drop_all_shards(kind):
+    with index_lock:
+        for course_id in list_shards(kind):
+            drop_shard(kind, course_id)
+
+
+def search_index(kind, course_id, queries, k):
+    with index_lock:
+        return get_index(kind, course_id).search(queries, k)
+
+
+# the shards a plagiarism scan searches: the material's own course, or every
+# shard of both kinds when scope is "global"
+def search_shards(course_id, scope="course"):
+    if scope == "global":
+        return [(kind, cid) for kind in index_kinds for cid in list_shards(kind)]
+    return [(kind, course_id) for kind in index_kinds if shard_exists(kind, course_id)]
+
+
+# candidates to fetch per query so that `k` survive exact re-ranking
+def candidate_count(kind, course_id, k):
+    if index_type_of(get_index(kind, course_id)) in quantized_index_types:
+        return k * FAISS_RERANK_FACTOR
+    return k
+
+
+# new defaults apply to every loaded shard and to shards loaded later
+def tune_index(nprobe=None, ef_search=None):
+    global FAISS_NPROBE, FAISS_EF_SEARCH
+    with index_lock:
+        if nprobe is not None:
+            FAISS_NPROBE = int(nprobe)
+        if ef_search is not None:
+            FAISS_EF_SEARCH = int(ef_search)
+        for shard in loaded_shards.values():
+            set_search_params(shard.index, nprobe=nprobe, ef_search=ef_search)
+
+
+def index_info(kind, course_id):
+    index = get_index(kind, course_id)
+    info = {
+        "kind": kind,
+        "courseId": course_id,
+        "type": index_type_of(index),
+        "ntotal": int(index.ntotal),
+    }
+    inner = base_index(index)
+    if isinstance(inner, faiss.IndexIVF):
+        info["nlist"] = int(inner.nlist)
+        info["nprobe"] = int(inner.nprobe)
+    elif isinstance(inner, faiss.IndexHNSW):
+        info["efSearch"] = int(inner.hnsw.efSearch)
+    try:
+        info["bytesPerVector"] = int(inner.sa_code_size())
+    except RuntimeError:
+        pass
+    info["candidateFactor"] = candidate_count(kind, course_id, 1)
+    return info
+
 
-faiss_course_index = load_or_create_faiss_index(course_index_file)
-faiss_submission_index = load_or_create_faiss_index(submission_index_file)
+if any(os.path.exists(f) for f in legacy_index_files) and not any(
+    list_shards(kind) for kind in index_kinds
+):
+    print(
+        "[WARN] Found unsharded FAISS indexes; run rebuild_indexes.py to split "
+        "them into per-course shards"
+    )
@@ -0,0 +1,223 @@
+import os
+import re
+import atexit
+import asyncio
+import threading
+import urllib.parse
+import aiohttp
+import trafilatura
+from bs4 import BeautifulSoup
+from utils.text_utils import recursive_chunk
+from utils import web_cache
+
+# search endpoint; point it at a local stand-in server for testing
+DDG_LITE_URL = os.getenv("DDG_LITE_URL", "https://lite.duckduckgo.com/lite/")
+# open connections across all hosts, and per host (DuckDuckGo rate-limits)
+FETCH_MAX_CONCURRENCY = int(os.getenv("FETCH_MAX_CONCURRENCY", "32"))
+FETCH_PER_HOST = int(os.getenv("FETCH_PER_HOST", "8"))
+# seconds per request, and for all searches and fetches of one scan
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))
+SCAN_FETCH_TIMEOUT = float(os.getenv("SCAN_FETCH_TIMEOUT", "60"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "2"))
+
+headers = {"User-Agent": "Mozilla/5.0"}
+
+# one event loop thread owns the pooled session, so keep-alive connections are
+# reused across chunks, scans and Flask request threads
+_loop = None
+_session = None
+_loop_lock = threading.Lock()
+
+
+def get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="fetch-engine", daemon=True
+            ).start()
+    return _loop
+
+
+# run a coroutine on the engine loop from any thread and wait for its result
+def run(coro):
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+
+async def get_session():
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=FETCH_MAX_CONCURRENCY,
+            limit_per_host=FETCH_PER_HOST,
+            ttl_dns_cache=300,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT),
+        )
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+
+# close pooled connections cleanly when the process exits
+@atexit.register
+def close():
+    if _loop is not None and _session is not None:
+        try:
+            asyncio.run_coroutine_threadsafe(close_session(), _loop).result(5)
+        except Exception:
+            pass
+
+
+# body of a 200 response, or None after FETCH_RETRIES failed attempts
+async def fetch_text(url, params=None):
+    session = await get_session()
+    for attempt in range(FETCH_RETRIES):
+        try:
+            async with session.get(url, params=params) as resp:
+                if resp.status != 200:
+                    return None
+                return await resp.text(errors="replace")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if attempt + 1 < FETCH_RETRIES:
+                await asyncio.sleep(0.3)
+    return None
+
+
+def parse_ddg_results(html, num_results):
+    urls = []
+    soup = BeautifulSoup(html, "html.parser")
+    for a in soup.find_all("a", href=True):
+        href = a["href"]
+        if "/l/?" in href and "uddg=" in href:
+            parsed = urllib.parse.urlparse(href)
+            q = urllib.parse.parse_qs(parsed.query)
+            real_url = q.get("uddg", [None])[0]
+            if real_url:
+                urls.append(real_url)
+        if len(urls) >= num_results:
+            break
+    return urls
+
+
+def extract_snippets(html, max_words=1200, chunk_size=500, chunk_overlap=30):
+    text = trafilatura.extract(html, favor_recall=True) or ""
+    full_text = re.sub(r"\s+", " ", text).strip()
+
+    words = full_text.split()
+    limited_text = " ".join(words[:max_words])
+
+    chunks = recursive_chunk(
+        limited_text,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+    )
+
+    # remove duplicate
+    return list(dict.fromkeys(chunks))
+
+
+# parsing and cache lookups block; they run in the default executor to keep the
+# loop free. Only non-empty results are cached, failures are retried next scan
+async def in_executor(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+async def search(query, num_results=3):
+    try:
+        urls = await in_executor(web_cache.get_search, query, num_results)
+        if urls is not None:
+            return urls
+        html = await fetch_text(DDG_LITE_URL, params={"q": query})
+        if html is None:
+            return []
+        urls = await in_executor(parse_ddg_results, html, num_results)
+        if urls:
+            await in_executor(web_cache.put_search, query, num_results, urls)
+        return urls
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[ERROR] ddg_lite_search: {e}")
+        return []
+
+
+async def fetch_snippets(url):
+    try:
+        snippets = await in_executor(web_cache.get_snippets, url)
+        if snippets is not None:
+            return snippets
+        html = await fetch_text(url)
+        if html is None:
+            return []
+        snippets = await in_executor(extract_snippets, html)
+        if snippets:
+            await in_executor(web_cache.put_snippets, url, snippets)
+        return snippets
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"[ERROR] fetch_web_snippet: {e}")
+        return []
+
+
+# search every query and fetch every distinct result URL once, all concurrently.
+# num_results is one count for all queries or a list with one per query.
+# Returns the URLs per query and the snippets per URL; whatever has not finished
+# after SCAN_FETCH_TIMEOUT is cancelled and counts as no result.
+async def gather_online(queries, num_results=3):
+    url_tasks = {}
+    if isinstance(num_results, int):
+        num_results = [num_results] * len(queries)
+
+    async def search_and_fetch(query, count):
+        urls = await search(query, count)
+        for url in urls:
+            if url not in url_tasks:
+                url_tasks[url] = asyncio.ensure_future(fetch_snippets(url))
+        return urls
+
+    search_tasks = [
+        asyncio.ensure_future(search_and_fetch(q, n))
+        for q, n in zip(queries, num_results)
+    ]
+    if not search_tasks:
+        return [], {}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SCAN_FETCH_TIMEOUT
+
+    await asyncio.wait(search_tasks, timeout=SCAN_FETCH_TIMEOUT)
+    fetches = list(url_tasks.values())
+    if fetches:
+        await asyncio.wait(fetches, timeout=max(0.0, deadline - loop.time()))
+
+    # searches still running may have started fetches after `fetches` was taken
+    pending = [t for t in search_tasks + list(url_tasks.values()) if not t.done()]
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+        print(
+            f"[WARN] {len(pending)} online requests cancelled after "
+            f"{SCAN_FETCH_TIMEOUT}s"
+        )
+
+    urls_per_query = [
+        t.result() if t.done() and not t.cancelled() else [] for t in search_tasks
+    ]
+    url_snippets = {
+        url: t.result() if t.done() and not t.cancelled() else []
+        for url, t in url_tasks.items()
+    }
+    return urls_per_query, url_snippets
@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import faiss
+from config.database import DB_PATH
+from utils.file_utils import download_file
+from utils.text_utils import extract_text, recursive_chunk
+from utils.embedding_utils import encode_embedding, QUERY_EMBEDDING_MODE
+from utils.embedding_batcher import embed_texts
+from utils.shingle_utils import shingle_hashes, encode_shingles
+from utils.minhash_utils import minhash_of, encode_signature, lsh_rows
+from utils.neighbor_utils import PRECOMPUTE_NEIGHBORS
+from utils.plagiarism_utils import precompute_neighbors
+from utils.faiss_utils import (
+    index_lock,
+    allocate_faiss_ids,
+    add_vectors,
+    remove_vectors,
+    save_index,
+)
+
+
+# download, extract, embed and index one material into the course or submission
+# shard of its course
+def ingest_material(material_id, target, submission_id=None):
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    # ids whose vectors are in the shard but whose chunks are not committed yet
+    added_ids = None
+
+    try:
+        cursor.execute(
+            "SELECT s3_url, courseId FROM materials WHERE id = ?", (material_id,)
+        )
+        row = cursor.fetchone()
+        if not row:
+            raise Exception("Material not found")
+        if not row[0]:
+            raise Exception("No file URL in material")
+        course_id = row[1]
+
+        cursor.execute(
+            "UPDATE materials SET processingStatus = 'processing' WHERE id = ?",
+            (material_id,),
+        )
+        conn.commit()
+
+        local_path = download_file(row[0])
+        try:
+            text = extract_text(local_path)
+        finally:
+            try:
+                os.unlink(local_path)
+            except FileNotFoundError:
+                pass
+
+        chunks = recursive_chunk(text, chunk_size=500, chunk_overlap=50)
+        chunk_inputs = [f"passage: {c}" for c in chunks]
+        if QUERY_EMBEDDING_MODE == "stored":
+            # the scan's query side, so it never encodes the material's own text
+            chunk_inputs += [f"query: {c}" for c in chunks]
+        all_embeddings = embed_texts(chunk_inputs)
+        faiss.normalize_L2(all_embeddings)
+        embeddings = all_embeddings[: len(chunks)]
+        query_embeddings = all_embeddings[len(chunks) :]
+        shingles = [shingle_hashes(c) for c in chunks]
+        signatures = [minhash_of(h) for h in shingles]
+
+        with index_lock:
+            # a retried job must not leave the chunks of its previous attempt behind
+            cursor.execute(
+                "SELECT faissId FROM chunks WHERE materialId = ?", (material_id,)
+            )
+            stale_ids = [r[0] for r in cursor.fetchall() if r[0] is not None]
+            if stale_ids:
+                remove_vectors(target, course_id, stale_ids)
+            cursor.execute("DELETE FROM chunks WHERE materialId = ?", (material_id,))
+
+            faiss_ids = allocate_faiss_ids(cursor, len(chunks))
+            if len(chunks):
+                added_ids = faiss_ids
+                add_vectors(target, course_id, faiss_ids, embeddings)
+            cursor.executemany(
+                """
+                INSERT INTO chunks
+                    (materialId, faissId, text, embedding, queryEmbedding,
+                     minhash, shingles)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        material_id,
+                        int(faiss_id),
+                        chunk_text,
+                        encode_embedding(embedding),
+                        (
+                            encode_embedding(query_embeddings[i])
+                            if len(query_embeddings)
+                            else None
+                        ),
+                        encode_signature(signatures[i]),
+                        encode_shingles(shingles[i]),
+                    )
+                    for i, (faiss_id, chunk_text, embedding) in enumerate(
+                        zip(faiss_ids, chunks, embeddings)
+                    )
+                ],
+            )
+            cursor.executemany(
+                "INSERT INTO chunk_lsh (band, bucket, faissId) VALUES (?, ?, ?)",
+                [
+                    row
+                    for faiss_id, signature in zip(faiss_ids, signatures)
+                    for row in lsh_rows(faiss_id, signature)
+                ],
+            )
+
+            cursor.execute(
+                """
+                UPDATE materials
+                SET submissionId = COALESCE(?, submissionId), processingStatus = 'done',
+                    chunkCount = ?, extractedTextLength = ?, neighborsReady = 0
+                WHERE id = ?
+                """,
+                (submission_id, len(chunks), len(text), material_id),
+            )
+            conn.commit()
+            added_ids = None
+            save_index(target, course_id)
+
+        # the database half of later reports, and this material as a neighbor of
+        # older ones; on failure the first scan computes it instead
+        if PRECOMPUTE_NEIGHBORS:
+            try:
+                precompute_neighbors(material_id)
+            except Exception as e:
+                print(f"[WARN] Neighbor precomputation for {material_id} failed: {e}")
+
+        return {
+            "materialId": material_id,
+            "status": "done",
+            "numChunks": len(chunks),
+            "extractedTextLength": len(text),
+        }
+
+    except Exception:
+        # the rollback hands these ids to the next material, so their vectors
+        # must leave the shard first
+        if added_ids is not None:
+            try:
+                remove_vectors(target, course_id, added_ids)
+            except Exception as e:
+                print(f"[ERROR] Removing vectors of material {material_id} failed: {e}")
+        conn.rollback()
+        cursor.execute(
+            "UPDATE materials SET processingStatus = 'error' WHERE id = ?",
+            (material_id,),
+        )
+        conn.commit()
+        raise
+
+    finally:
+        conn.close()
@@ -0,0 +1,232 @@
+import os
+import sqlite3
+import threading
+import traceback
+from config.database import DB_PATH
+
+poll_interval = float(os.getenv("INGEST_POLL_INTERVAL", "2"))
+# a job still "running" after this long belongs to a dead worker and is picked up again
+job_timeout = int(os.getenv("INGEST_JOB_TIMEOUT", "1800"))
+max_attempts = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+# a failed job waits retry_delay seconds per attempt so far before it is claimed again
+retry_delay = int(os.getenv("INGEST_RETRY_DELAY", "30"))
+
+_wakeup = threading.Event()
+_workers = []
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+# queue one material; the material goes back to 'pending' until a worker claims it
+def enqueue_job(material_id, target, submission_id=None):
+    conn = _connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(
+            "INSERT INTO jobs (materialId, target, submissionId) VALUES (?, ?, ?)",
+            (material_id, target, submission_id),
+        )
+        job_id = cursor.lastrowid
+        cursor.execute(
+            """
+            UPDATE materials
+            SET processingStatus = 'pending', submissionId = COALESCE(?, submissionId)
+            WHERE id = ?
+            """,
+            (submission_id, material_id),
+        )
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+    _wakeup.set()
+    return job_id
+
+
+def _claim_job():
+    conn = _connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        # a job that kept killing or hanging its worker gives up like a failing one
+        cursor.execute(
+            """
+            UPDATE materials SET processingStatus = 'error'
+            WHERE id IN (
+                SELECT materialId FROM jobs
+                WHERE status = 'running' AND startedAt < datetime('now', ?)
+                  AND attempts >= ?
+            )
+            """,
+            (f"-{job_timeout} seconds", max_attempts),
+        )
+        cursor.execute(
+            """
+            UPDATE jobs
+            SET status = 'error', error = 'worker timed out',
+                finishedAt = datetime('now')
+            WHERE status = 'running' AND startedAt < datetime('now', ?)
+              AND attempts >= ?
+            """,
+            (f"-{job_timeout} seconds", max_attempts),
+        )
+        cursor.execute(
+            """
+            SELECT id, materialId, target, submissionId
+            FROM jobs
+            WHERE (status = 'queued' AND (finishedAt IS NULL OR finishedAt
+                   <= datetime('now', '-' || (attempts * ?) || ' seconds')))
+               OR (status = 'running' AND startedAt < datetime('now', ?)
+                   AND attempts < ?)
+            ORDER BY id
+            LIMIT 1
+            """,
+            (retry_delay, f"-{job_timeout} seconds", max_attempts),
+        )
+        row = cursor.fetchone()
+        if row:
+            cursor.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', attempts = attempts + 1,
+                    startedAt = datetime('now'), error = NULL
+                WHERE id = ?
+                """,
+                (row[0],),
+            )
+        cursor.execute("COMMIT")
+        return row
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def _finish_job(job_id, error=None):
+    conn = _connect()
+    try:
+        if error is None:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', finishedAt = datetime('now') WHERE id = ?",
+                (job_id,),
+            )
+        else:
+            # retry transient failures until the attempt budget is spent; _claim_job
+            # holds the job back for retry_delay seconds per attempt
+            conn.execute(
+                """
+                UPDATE jobs
+                SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'error' END,
+                    error = ?, finishedAt = datetime('now')
+                WHERE id = ?
+                """,
+                (max_attempts, error, job_id),
+            )
+            conn.execute(
+                """
+                UPDATE materials SET processingStatus = 'pending'
+                WHERE id = (SELECT materialId FROM jobs WHERE id = ? AND status = 'queued')
+                """,
+                (job_id,),
+            )
+    finally:
+        conn.close()
+
+
+def _worker_loop(worker_name):
+    # imported here so the queue module stays cheap to import for status endpoints
+    from utils.ingest_utils import ingest_material
+
+    while True:
+        try:
+            job = _claim_job()
+        except Exception as e:
+            print(f"[ERROR] {worker_name} claim failed: {e}")
+            job = None
+
+        if not job:
+            _wakeup.wait(poll_interval)
+            _wakeup.clear()
+            continue
+
+        job_id, material_id, target, submission_id = job
+        print(f"[INFO] {worker_name} processing job {job_id} (material {material_id})")
+        try:
+            result = ingest_material(material_id, target, submission_id)
+            _finish_job(job_id)
+            print(
+                f"[INFO] {worker_name} finished job {job_id}: {result['numChunks']} chunks"
+            )
+        except Exception as e:
+            traceback.print_exc()
+            _finish_job(job_id, error=str(e))
+
+
+def start_workers(num_workers=None):
+    if _workers:
+        return _workers
+    if num_workers is None:
+        num_workers = int(os.getenv("INGEST_WORKERS", "2"))
+
+    for i in range(num_workers):
+        worker = threading.Thread(
+            target=_worker_loop, args=(f"ingest-worker-{i}",), daemon=True
+        )
+        worker.start()
+        _workers.append(worker)
+
+    print(f"[INFO] Started {num_workers} ingestion workers")
+    return _workers
+
+
+def workers_alive():
+    return sum(1 for worker in _workers if worker.is_alive())
+
+
+# per-material progress, joined with the latest job of each material
+def get_material_status(cursor, where, params):
+    cursor.execute(
+        f"""
+        SELECT m.id, m.title, m.processingStatus, m.chunkCount, m.extractedTextLength,
+               j.id, j.status, j.attempts, j.error, j.createdAt, j.startedAt, j.finishedAt
+        FROM materials m
+        LEFT JOIN jobs j ON j.id = (
+            SELECT MAX(id) FROM jobs WHERE materialId = m.id
+        )
+        WHERE {where}
+        ORDER BY m.id
+        """,
+        params,
+    )
+    return [
+        {
+            "materialId": row[0],
+            "title": row[1],
+            "processingStatus": row[2],
+            "chunkCount": row[3],
+            "extractedTextLength": row[4],
+            "job": (
+                {
+                    "jobId": row[5],
+                    "status": row[6],
+                    "attempts": row[7],
+                    "error": row[8],
+                    "createdAt": row[9],
+                    "startedAt": row[10],
+                    "finishedAt": row[11],
+                }
+                if row[5] is not None
+                else None
+            ),
+        }
+        for row in cursor.fetchall()
+    ]
@@ -0,0 +1,94 @@
+import sys
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# every cache by name, for /health
+caches = {}
+
+# per entry: the OrderedDict node, the key digest and the (value, size) tuple
+entry_overhead = 160
+
+
+# keys are stored as 16-byte digests, so a chunk text used as a key is not held
+# a second time next to the chunk itself
+def hash_key(key):
+    if isinstance(key, str):
+        key = key.encode("utf-8")
+    return hashlib.blake2b(key, digest_size=16).digest()
+
+
+# approximate in-memory size of a cached value
+def value_size(value):
+    if isinstance(value, np.ndarray):
+        return sys.getsizeof(value) + (0 if value.base is None else value.nbytes)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(value_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+# thread-safe LRU bounded by the approximate bytes of its values
+class LRUCache:
+    def __init__(self, name, max_mb):
+        self.name = name
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        caches[name] = self
+
+    def get(self, key, default=None):
+        digest = hash_key(key)
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.entries.move_to_end(digest)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        digest = hash_key(key)
+        size = value_size(value) + entry_overhead
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(digest, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self.entries[digest] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hitRate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+def memory_cache_stats():
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -0,0 +1,126 @@
+import os
+import numpy as np
+from utils.db_utils import sql_batch_size
+from utils.shingle_utils import shingle_hashes
+
+# MinHash over the shingle hashes of shingle_utils, the same shingles every
+# Jaccard score uses. Signatures and band keys are stored at ingest; changing
+# these constants or the shingles needs backfill_minhash.py --rebuild
+num_permutations = 64
+# bands of two values: a pair of chunks with shingle Jaccard J shares at least one
+# band with probability 1 - (1 - J^2)^32, about 0.95 at J = 0.3
+rows_per_band = 2
+num_bands = num_permutations // rows_per_band
+
+# candidates below this estimated Jaccard are dropped before the exact check
+MINHASH_MIN_JACCARD = float(os.getenv("MINHASH_MIN_JACCARD", "0.2"))
+# most similar candidates kept per chunk
+MINHASH_MAX_CANDIDATES = int(os.getenv("MINHASH_MAX_CANDIDATES", "10"))
+
+# multiply-shift hash family: h(x) = (a * x + b) mod 2^64, top 32 bits
+_rng = np.random.default_rng(20240521)
+_mul = _rng.integers(1, 2**63, size=num_permutations, dtype=np.uint64) | np.uint64(1)
+_add = _rng.integers(0, 2**63, size=num_permutations, dtype=np.uint64)
+
+
+# uint32 signature of a set of shingle hashes, or None when it is empty
+def minhash_of(hashes):
+    if not len(hashes):
+        return None
+    with np.errstate(over="ignore"):
+        values = hashes[:, None] * _mul[None, :] + _add[None, :]
+    return (values >> np.uint64(32)).min(axis=0).astype(np.uint32)
+
+
+# signature of a text, or None when it is shorter than one shingle
+def minhash_signature(text):
+    return minhash_of(shingle_hashes(text))
+
+
+def encode_signature(signature):
+    return None if signature is None else signature.tobytes()
+
+
+def decode_signature(blob):
+    return np.frombuffer(blob, dtype=np.uint32)
+
+
+# one int64 bucket per band: its two consecutive uint32 values read as one number
+def band_keys(signature):
+    return np.ascontiguousarray(signature).view(np.int64)
+
+
+# chunk_lsh rows (band, bucket, faissId) of one chunk
+def lsh_rows(faiss_id, signature):
+    if signature is None:
+        return []
+    return [
+        (band, int(bucket), int(faiss_id))
+        for band, bucket in enumerate(band_keys(signature))
+    ]
+
+
+# chunks of other materials sharing an LSH band with the given signatures, ranked
+# by estimated Jaccard. signatures: {chunkNo: signature}; the "course" scope keeps
+# candidates of course_id only. Returns {chunkNo: [faissId, ...]}
+def find_copy_candidates(cursor, signatures, material_id, course_id, scope="course"):
+    probes = [
+        (chunk_no, band, int(bucket))
+        for chunk_no, signature in signatures.items()
+        if signature is not None
+        for band, bucket in enumerate(band_keys(signature))
+    ]
+    if not probes:
+        return {}
+
+    cursor.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS lsh_probe "
+        "(chunkNo INTEGER, band INTEGER, bucket INTEGER)"
+    )
+    cursor.execute("DELETE FROM lsh_probe")
+    cursor.executemany("INSERT INTO lsh_probe VALUES (?, ?, ?)", probes)
+    course_filter = "AND m.courseId IS ?" if scope != "global" else ""
+    cursor.execute(
+        f"""
+        SELECT DISTINCT p.chunkNo, l.faissId
+        FROM lsh_probe p
+        JOIN chunk_lsh l ON l.band = p.band AND l.bucket = p.bucket
+        JOIN chunks c ON c.faissId = l.faissId
+        JOIN materials m ON m.id = c.materialId
+        WHERE c.materialId != ? {course_filter}
+        """,
+        (material_id,) if scope == "global" else (material_id, course_id),
+    )
+    pairs = cursor.fetchall()
+    cursor.execute("DELETE FROM lsh_probe")
+
+    # estimated Jaccard from the stored signatures of the candidates
+    candidate_ids = sorted({faiss_id for _, faiss_id in pairs})
+    stored = {}
+    for start in range(0, len(candidate_ids), sql_batch_size):
+        batch = candidate_ids[start : start + sql_batch_size]
+        cursor.execute(
+            f"""
+            SELECT faissId, minhash FROM chunks
+            WHERE faissId IN ({",".join("?" * len(batch))})
+            """,
+            batch,
+        )
+        stored.update(
+            (fid, decode_signature(blob)) for fid, blob in cursor.fetchall() if blob
+        )
+
+    scored = {}
+    for chunk_no, faiss_id in pairs:
+        if faiss_id not in stored:
+            continue
+        estimate = float(np.mean(signatures[chunk_no] == stored[faiss_id]))
+        if estimate >= MINHASH_MIN_JACCARD:
+            scored.setdefault(chunk_no, []).append((estimate, faiss_id))
+
+    return {
+        chunk_no: [
+            fid for _, fid in sorted(found, reverse=True)[:MINHASH_MAX_CANDIDATES]
+        ]
+        for chunk_no, found in scored.items()
+    }
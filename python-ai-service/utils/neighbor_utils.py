@@ -0,0 +1,102 @@
+import os
+import json
+
+# Database neighbors of every chunk, computed when a material is indexed and
+# read back by course-scope plagiarism checks instead of searching FAISS again.
+# Pairs are stored in both directions, so older chunks also list newer copies.
+PRECOMPUTE_NEIGHBORS = os.getenv("PRECOMPUTE_NEIGHBORS", "1") == "1"
+# best stored neighbors kept per chunk once newer materials add reverse pairs;
+# the scan itself keeps top_k + 1 per shard plus the MinHash candidates
+NEIGHBOR_KEEP = int(os.getenv("NEIGHBOR_KEEP", "24"))
+# neighbors per shard the stored pairs were searched with; scans asking for
+# another top_k search live
+neighbor_top_k = 5
+
+
+def neighbors_ready(cursor, material_id):
+    cursor.execute(
+        "SELECT neighborsReady FROM materials WHERE id = ?", (material_id,)
+    )
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+# store the matches of scan_database for a material and the reverse pairs, then
+# trim every touched chunk to its NEIGHBOR_KEEP best neighbors
+def store_neighbors(cursor, material_id, matches):
+    # shard the scanned material lives in, the source of its reverse pairs
+    cursor.execute(
+        "SELECT submissionId IS NOT NULL FROM materials WHERE id = ?", (material_id,)
+    )
+    row = cursor.fetchone()
+    kind = "submission" if row and row[0] else "course"
+
+    rows = []
+    for m in matches:
+        if m["chunkFaissId"] is None:
+            continue
+        spans = [
+            (s["chunkStart"], s["chunkEnd"], s["sourceStart"], s["sourceEnd"])
+            for s in m["matchedSpans"]
+        ]
+        scores = (m["semantic_sim"], m["ngram_sim"], m["exact_sim"], m["similarity"])
+        rows.append(
+            (m["chunkFaissId"], m["neighborFaissId"])
+            + scores
+            + (json.dumps(spans), m["indexSource"])
+        )
+        # the neighbor's view of the same pair: spans with both sides swapped,
+        # found in this material's shard unless it came from the LSH buckets
+        swapped = sorted((c, d, a, b) for a, b, c, d in spans)
+        source = "minhash" if m["indexSource"] == "minhash" else kind
+        rows.append(
+            (m["neighborFaissId"], m["chunkFaissId"])
+            + scores
+            + (json.dumps(swapped), source)
+        )
+
+    cursor.executemany(
+        """
+        INSERT OR REPLACE INTO chunk_neighbors
+            (faissId, neighborFaissId, semantic, ngram, exact, similarity, spans, source)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+    touched = sorted({r[0] for r in rows})
+    cursor.executemany(
+        """
+        DELETE FROM chunk_neighbors
+        WHERE faissId = ? AND neighborFaissId NOT IN (
+            SELECT neighborFaissId FROM chunk_neighbors
+            WHERE faissId = ? ORDER BY similarity DESC LIMIT ?
+        )
+        """,
+        [(fid, fid, NEIGHBOR_KEEP) for fid in touched],
+    )
+    cursor.execute(
+        "UPDATE materials SET neighborsReady = 1 WHERE id = ?", (material_id,)
+    )
+
+
+# stored neighbors of a material's chunks in the given course, as
+# (chunkFaissId, neighborFaissId, semantic, ngram, exact, spans, source,
+#  neighborText, neighborMaterialId, neighborCourseId, neighborOwnerType)
+def fetch_neighbors(cursor, material_id, course_id):
+    cursor.execute(
+        """
+        SELECT n.faissId, n.neighborFaissId, n.semantic, n.ngram, n.exact,
+               n.spans, n.source, nc.text, nc.materialId, m.courseId, m.ownerType
+        FROM chunks c
+        JOIN chunk_neighbors n ON n.faissId = c.faissId
+        JOIN chunks nc ON nc.faissId = n.neighborFaissId
+        JOIN materials m ON m.id = nc.materialId
+        WHERE c.materialId = ? AND nc.materialId != ? AND m.courseId IS ?
+        ORDER BY n.faissId, n.similarity DESC
+        """,
+        (material_id, material_id, course_id),
+    )
+    return [
+        row[:5] + ([tuple(s) for s in json.loads(row[5])],) + row[6:]
+        for row in cursor.fetchall()
+    ]
@@ -1,127 +1,219 @@
-import requests
-from bs4 import BeautifulSoup
-import urllib.parse
-import trafilatura
-import re
-from difflib import SequenceMatcher
+import os
 import numpy as np
-import json
 import sqlite3
-import time
-from keybert import KeyBERT
+import threading
 from config.database import DB_PATH
-from models.embedding import model
-from utils.text_utils import recursive_chunk
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from utils.faiss_utils import faiss_course_index, faiss_submission_index
-
-
-# ssl safe request with retries
-def safe_request(url, headers=None, timeout=10, retries=2, params=None):
-    for _ in range(retries):
-        try:
-            return requests.get(url, headers=headers, timeout=timeout, params=params)
-        except Exception:
-            time.sleep(0.3)
-    return None
+from models.embedding import get_model
+from utils.embedding_batcher import embed_texts
+from utils.memory_cache import LRUCache
+from utils import fetch_engine
+from utils.embedding_utils import decode_embedding, QUERY_EMBEDDING_MODE
+from utils.db_utils import sql_batch_size, fetch_chunk_metadata
+from utils.minhash_utils import minhash_of, find_copy_candidates
+from utils.alignment_utils import align, align_snippets, tokenize
+from utils.shingle_utils import shingle_hashes, decode_shingles, jaccard, jaccard_pairs
+from utils.neighbor_utils import (
+    PRECOMPUTE_NEIGHBORS,
+    neighbor_top_k,
+    neighbors_ready,
+    store_neighbors,
+    fetch_neighbors,
+)
+from utils.faiss_utils import (
+    search_index,
+    search_shards,
+    candidate_count,
+    get_vector_store,
+)
 
 
 # duckduckgo lite search
 def ddg_lite_search(query, num_results=3):
-    urls = []
-    try:
-        url = "https://lite.duckduckgo.com/lite/"
-        headers = {"User-Agent": "Mozilla/5.0"}
-        params = {"q": query}
-
-        resp = safe_request(url, headers=headers, timeout=10, params=params)
-        if not resp or resp.status_code != 200:
-            return urls
-
-        soup = BeautifulSoup(resp.text, "html.parser")
-        for a in soup.find_all("a", href=True):
-            href = a["href"]
-            if "/l/?" in href and "uddg=" in href:
-                parsed = urllib.parse.urlparse(href)
-                q = urllib.parse.parse_qs(parsed.query)
-                real_url = q.get("uddg", [None])[0]
-                if real_url:
-                    urls.append(real_url)
-            if len(urls) >= num_results:
-                break
-    except Exception as e:
-        print(f"[ERROR] ddg_lite_search: {e}")
-
-    return urls
+    return fetch_engine.run(fetch_engine.search(query, num_results))
 
 
 # fetch web snippet
-def fetch_web_snippet(url, max_words=1200, chunk_size=500, chunk_overlap=30):
-    try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        resp = safe_request(url, headers=headers, timeout=10)
-        if not resp or resp.status_code != 200:
-            return []
+def fetch_web_snippet(url):
+    return fetch_engine.run(fetch_engine.fetch_snippets(url))
 
-        text = trafilatura.extract(resp.text, favor_recall=True) or ""
 
-        full_text = re.sub(r"\s+", " ", text).strip()
+# string similarity
+def substring_similarity(text1, text2):
+    return align(text1, text2)[0]
 
-        words = full_text.split()
-        limited_text = " ".join(words[:max_words])
 
-        chunks = recursive_chunk(
-            limited_text,
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-        )
+# matched character spans as report fields
+def span_dicts(spans):
+    return [
+        {"chunkStart": a, "chunkEnd": b, "sourceStart": c, "sourceEnd": d}
+        for a, b, c, d in spans
+    ]
 
-        # remove duplicate
-        chunks = list(dict.fromkeys(chunks))
 
-        return chunks
+# normalized e5 embeddings of web snippets keyed by (hashed) snippet text, shared
+# by every chunk and scan that meets the same snippet
+SNIPPET_EMBEDDING_CACHE_MB = float(os.getenv("SNIPPET_EMBEDDING_CACHE_MB", "96"))
+snippet_embedding_cache = LRUCache("snippetEmbeddings", SNIPPET_EMBEDDING_CACHE_MB)
 
-    except Exception as e:
-        print(f"[ERROR] fetch_web_snippet: {e}")
-        return []
 
+def normalize_rows(embeddings):
+    return embeddings / np.linalg.norm(embeddings, axis=-1, keepdims=True)
 
-# string similarity
-def normalize_text(text):
-    text = text.lower()
-    text = re.sub(r"\s+", " ", text)
-    text = re.sub(r"[^\w\s]", "", text, flags=re.UNICODE)
-    return text.strip()
 
+def embed_query(text):
+    return normalize_rows(embed_texts([f"query: {text}"])[0])
 
-def substring_similarity(text1, text2):
-    return SequenceMatcher(None, normalize_text(text1), normalize_text(text2)).ratio()
 
+# a chunk's query-side vector, without the model unless QUERY_EMBEDDING_MODE
+# is "encode" or the chunk predates chunks.queryEmbedding
+def chunk_query_embedding(chunk_text, passage_blob, query_blob):
+    if QUERY_EMBEDDING_MODE == "stored" and query_blob is not None:
+        return decode_embedding(query_blob)
+    if QUERY_EMBEDDING_MODE == "passage" and passage_blob is not None:
+        return decode_embedding(passage_blob)
+    return embed_query(chunk_text)
+
+
+# one model call for the snippets that are not cached yet
+def embed_snippets(snippets):
+    found = {s: snippet_embedding_cache.get(s) for s in snippets}
+    missing = [s for s, emb in found.items() if emb is None]
+
+    if missing:
+        embeddings = normalize_rows(embed_texts([f"passage: {s}" for s in missing]))
+        for snippet, embedding in zip(missing, embeddings):
+            # a copy, so a cached row does not keep its whole batch alive
+            found[snippet] = embedding.copy()
+            snippet_embedding_cache.put(snippet, found[snippet])
 
-# semantic similarity batch
-def semantic_similarity_batch(chunk_text, snippets, model):
+    return np.array([found[s] for s in snippets], dtype=np.float32).reshape(
+        len(snippets), -1
+    )
+
+
+# semantic similarity batch: cosine of one query embedding against many snippets
+def semantic_similarity_batch(emb_query, snippets):
     if not snippets:
         return []
+    return (embed_snippets(snippets) @ emb_query).tolist()
+
+
+# staged scoring of online snippets: every snippet gets the batched embedding and
+# shingle scores, and exact alignment runs only for the snippets that share word
+# bigrams with the chunk and score high enough on one of them
+CASCADE_LEXICAL_THRESHOLD = float(os.getenv("CASCADE_LEXICAL_THRESHOLD", "0.05"))
+CASCADE_SEMANTIC_THRESHOLD = float(os.getenv("CASCADE_SEMANTIC_THRESHOLD", "0.6"))
+cascade_counts = {"snippets": 0, "lexicalPassed": 0, "semanticPassed": 0}
+_cascade_lock = threading.Lock()
 
-    snippet_inputs = [f"passage: {s}" for s in snippets]
-    query_input = [f"query: {chunk_text}"]
 
-    emb_snippets = model.encode(
-        snippet_inputs, convert_to_numpy=True, show_progress_bar=False
-    ).astype(np.float32)
-    emb_query = model.encode(
-        query_input, convert_to_numpy=True, show_progress_bar=False
-    )[0].astype(np.float32)
+def word_bigrams(text):
+    words = tokenize(text)[0]
+    return set(zip(words, words[1:]))
 
-    emb_snippets /= np.linalg.norm(emb_snippets, axis=1, keepdims=True)
-    emb_query /= np.linalg.norm(emb_query)
 
-    sims = np.dot(emb_snippets, emb_query)
-    return sims.tolist()
+# share of the smaller word-bigram set found in the other text; bigrams, since
+# unrelated texts in one language already share most of their common words
+def bigram_overlap(bigrams, snippet):
+    other = word_bigrams(snippet)
+    if not bigrams or not other:
+        return 0.0
+    return len(bigrams & other) / min(len(bigrams), len(other))
+
+
+# (snippet, sem_sim, ngram_sim, final_score, exact_sim, spans) for every snippet;
+# snippets that skip the alignment stage keep exact_sim 0.0 and no spans
+def score_snippets(
+    chunk_text,
+    emb_query,
+    snippets,
+    chunk_shingles=None,
+    semantic_weight=0.7,
+    ngram_weight=0.3,
+    ngram_threshold=0.3,
+):
+    if chunk_shingles is None:
+        chunk_shingles = shingle_hashes(chunk_text)
+    ngram_sims = jaccard_pairs(
+        [chunk_shingles] * len(snippets), [shingle_hashes(s) for s in snippets]
+    )
 
+    scored = []
+    for snippet, sem_sim, ngram_sim in zip(
+        snippets, semantic_similarity_batch(emb_query, snippets), ngram_sims
+    ):
+        ngram_sim = float(ngram_sim)
+        final_score = semantic_weight * sem_sim + ngram_weight * ngram_sim
+        scored.append([snippet, sem_sim, ngram_sim, final_score, 0.0, []])
+
+    # an aligned span of ALIGN_MIN_WORDS words shares bigrams with the chunk, so
+    # snippets without shared bigrams have nothing to align
+    bigrams = word_bigrams(chunk_text)
+    lexical = [
+        row
+        for row in scored
+        if bigram_overlap(bigrams, row[0]) >= CASCADE_LEXICAL_THRESHOLD
+    ]
+    survivors = [
+        row
+        for row in lexical
+        if row[3] >= CASCADE_SEMANTIC_THRESHOLD or row[2] >= ngram_threshold
+    ]
+    for row, (exact_sim, spans) in zip(
+        survivors, align_snippets(chunk_text, [row[0] for row in survivors])
+    ):
+        row[4], row[5] = exact_sim, spans
+
+    with _cascade_lock:
+        cascade_counts["snippets"] += len(snippets)
+        cascade_counts["lexicalPassed"] += len(lexical)
+        cascade_counts["semanticPassed"] += len(survivors)
+    return [tuple(row) for row in scored]
+
+
+def cascade_stats():
+    with _cascade_lock:
+        result = dict(cascade_counts)
+    result["lexicalPassRate"] = (
+        round(result["lexicalPassed"] / result["snippets"], 3)
+        if result["snippets"]
+        else None
+    )
+    result["semanticPassRate"] = (
+        round(result["semanticPassed"] / result["lexicalPassed"], 3)
+        if result["lexicalPassed"]
+        else None
+    )
+    return result
+
+
+# keybert keyword extraction on the shared e5 model, so each process holds one
+# transformer. Candidates are embedded as e5 queries and ranked against the
+# chunk's passage embedding, the same space the stored chunk embeddings live in
+_kw_model = None
+_kw_model_lock = threading.Lock()
+
+
+def get_kw_model():
+    global _kw_model
+    if _kw_model is None:
+        with _kw_model_lock:
+            if _kw_model is None:
+                from keybert import KeyBERT
+                from keybert.backend import BaseEmbedder
+
+                class E5QueryBackend(BaseEmbedder):
+                    def embed(self, documents, verbose=False):
+                        return embed_texts([f"query: {d}" for d in documents])
+
+                _kw_model = KeyBERT(model=E5QueryBackend(get_model()))
+                print("[INFO] Keyword extraction uses the shared embedding model")
+    return _kw_model
+
+
+def kw_model_loaded():
+    return _kw_model is not None
 
-# keybert keyword extraction
-kw_model = KeyBERT(model="distiluse-base-multilingual-cased-v2")
 
 stop_words_vi_en = [
     "và",
@@ -146,30 +238,566 @@ stop_words_vi_en = [
     "on",
 ]
 
-keyword_cache = {}
+KEYWORD_CACHE_MB = float(os.getenv("KEYWORD_CACHE_MB", "16"))
+keyword_cache = LRUCache("keywords", KEYWORD_CACHE_MB)
+# candidate n-gram embeddings, shared by every chunk and submission that has them
+KEYWORD_CANDIDATE_CACHE_MB = float(os.getenv("KEYWORD_CANDIDATE_CACHE_MB", "64"))
+candidate_embedding_cache = LRUCache("keywordCandidates", KEYWORD_CANDIDATE_CACHE_MB)
+# chunks per KeyBERT pass; bounds the candidate matrix (vocabulary x 1024 floats)
+KEYWORD_BATCH_DOCS = int(os.getenv("KEYWORD_BATCH_DOCS", "128"))
+
 
+# embeddings of the candidate n-grams, only the uncached ones go to the model
+def embed_candidates(words):
+    found = [candidate_embedding_cache.get(w) for w in words]
+    missing = [i for i, emb in enumerate(found) if emb is None]
 
-def extract_keywords(text, top_n=25):
-    if text in keyword_cache:
-        return keyword_cache[text]
+    if missing:
+        embeddings = get_kw_model().model.embed([words[i] for i in missing])
+        for i, embedding in zip(missing, np.asarray(embeddings, dtype=np.float32)):
+            found[i] = embedding.copy()
+            candidate_embedding_cache.put(words[i], found[i])
 
-    keywords = kw_model.extract_keywords(
-        text, keyphrase_ngram_range=(1, 2), stop_words=stop_words_vi_en, top_n=top_n
+    return np.array(found, dtype=np.float32).reshape(len(words), -1)
+
+
+# one KeyBERT pass over a group of chunks: a single vocabulary, each distinct
+# candidate embedded once, every chunk ranked against its own candidates
+def _extract_keywords_group(texts, doc_embeddings, top_n):
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    vectorizer = CountVectorizer(ngram_range=(1, 2), stop_words=stop_words_vi_en)
+    try:
+        words = vectorizer.fit(texts).get_feature_names_out()
+    except ValueError:
+        # no candidate left in any chunk
+        return [[] for _ in texts]
+
+    keywords = get_kw_model().extract_keywords(
+        texts,
+        vectorizer=vectorizer,
+        top_n=top_n,
+        doc_embeddings=doc_embeddings,
+        word_embeddings=embed_candidates(list(words)),
     )
-    result = [kw[0] for kw in keywords]
-    keyword_cache[text] = result
-    return result
+    # keybert unwraps the result for a single document
+    if len(texts) == 1:
+        keywords = [keywords]
+    return [[kw[0] for kw in doc_keywords] for doc_keywords in keywords]
+
+
+# keywords of many chunks at once, in input order.
+# doc_embeddings: the chunks' stored "passage: " embeddings (None where missing),
+# saves encoding them again
+def extract_keywords_batch(texts, top_n=25, doc_embeddings=None):
+    if doc_embeddings is None:
+        doc_embeddings = [None] * len(texts)
+    results = [keyword_cache.get(f"{top_n}\n{t}") for t in texts]
+
+    # each distinct uncached chunk once
+    pending = {}
+    for text, result, embedding in zip(texts, results, doc_embeddings):
+        if result is None and text not in pending:
+            pending[text] = embedding
+    if pending:
+        unencoded = [t for t, emb in pending.items() if emb is None]
+        if unencoded:
+            encoded = embed_texts([f"passage: {t}" for t in unencoded])
+            pending.update(zip(unencoded, encoded))
+
+        todo = list(pending)
+        extracted = {}
+        for i in range(0, len(todo), KEYWORD_BATCH_DOCS):
+            group = todo[i : i + KEYWORD_BATCH_DOCS]
+            group_embeddings = np.array(
+                [pending[t] for t in group], dtype=np.float32
+            ).reshape(len(group), -1)
+            for text, keywords in zip(
+                group, _extract_keywords_group(group, group_embeddings, top_n)
+            ):
+                extracted[text] = keywords
+                keyword_cache.put(f"{top_n}\n{text}", keywords)
+        results = [r if r is not None else extracted[t] for t, r in zip(texts, results)]
+
+    return results
+
+
+def extract_keywords(text, top_n=25, doc_embedding=None):
+    return extract_keywords_batch([text], top_n, [doc_embedding])[0]
+
+
+# search query of each chunk row (faissId, text, embedding, ...): its keywords,
+# or the start of the chunk when it has none
+def chunk_queries(rows, top_n=20):
+    texts = [row[1] for row in rows]
+    try:
+        keywords = extract_keywords_batch(
+            texts,
+            top_n=top_n,
+            doc_embeddings=[
+                decode_embedding(row[2]) if row[2] is not None else None
+                for row in rows
+            ],
+        )
+    except Exception as e:
+        print(f"[ERROR online] keyword extraction: {e}")
+        keywords = [[] for _ in rows]
+    return [" ".join(kw) if kw else text[:200] for text, kw in zip(texts, keywords)]
+
+
+# chunks whose queries share at least this fraction of their words (Jaccard)
+# are searched once; 1 only merges identical queries
+QUERY_CLUSTER_THRESHOLD = float(os.getenv("QUERY_CLUSTER_THRESHOLD", "0.6"))
+# results asked for a cluster grow with its size, up to one DuckDuckGo lite page
+max_cluster_results = 10
+
+
+# query planning: greedy clustering of the chunk queries by word overlap with
+# each cluster's first query. Returns the query and result count of every
+# search, and the search index of every chunk
+def cluster_queries(queries, num_results=3, threshold=None):
+    if threshold is None:
+        threshold = QUERY_CLUSTER_THRESHOLD
+    leaders = []
+    members = []
+    assignment = []
+    for query in queries:
+        words = set(query.lower().split())
+        for i, leader in enumerate(leaders):
+            union = len(words | leader)
+            if union and len(words & leader) / union >= threshold:
+                members[i] += 1
+                assignment.append(i)
+                break
+        else:
+            leaders.append(words)
+            members.append(1)
+            assignment.append(len(leaders) - 1)
+
+    searches = [None] * len(leaders)
+    for query, i in zip(queries, assignment):
+        if searches[i] is None:
+            searches[i] = (
+                query,
+                min(
+                    num_results + members[i] - 1,
+                    max(num_results, max_cluster_results),
+                ),
+            )
+    return searches, assignment
+
+
+# keywords of every chunk of a submission's materials in one batched pass; the
+# per-material scans then find them in keyword_cache
+def extract_submission_keywords(material_ids, top_n=20):
+    if not material_ids:
+        return []
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        rows = []
+        for i in range(0, len(material_ids), sql_batch_size):
+            batch = material_ids[i : i + sql_batch_size]
+            rows.extend(
+                conn.execute(
+                    f"""
+                    SELECT faissId, text, embedding FROM chunks
+                    WHERE materialId IN ({",".join("?" * len(batch))})
+                    """,
+                    batch,
+                ).fetchall()
+            )
+    finally:
+        conn.close()
+    return chunk_queries(rows, top_n)
 
 
 def jaccard_similarity(text1, text2, n=5):
-    def ngrams(text):
-        words = text.split()
-        return set(tuple(words[i : i + n]) for i in range(len(words) - n + 1))
+    return jaccard(shingle_hashes(text1, n), shingle_hashes(text2, n))
+
+
+# neighbor vectors in one gather from the memory-mapped store; rows the store
+# does not have yet (e.g. before rebuild_indexes.py) fall back to chunks.embedding
+def gather_embeddings(vector_store, cursor, faiss_ids):
+    vectors, found = vector_store.get(faiss_ids)
+    missing = np.flatnonzero(~found)
+    for start in range(0, len(missing), sql_batch_size):
+        batch = missing[start : start + sql_batch_size]
+        placeholders = ",".join(["?"] * len(batch))
+        cursor.execute(
+            f"SELECT faissId, embedding FROM chunks WHERE faissId IN ({placeholders})",
+            [int(faiss_ids[i]) for i in batch],
+        )
+        stored = {fid: emb for fid, emb in cursor.fetchall() if emb}
+        for i in batch:
+            emb = stored.get(int(faiss_ids[i]))
+            if emb:
+                vectors[i] = decode_embedding(emb)
+    return vectors
+
+
+# stored embeddings of chunks by faissId, for neighbors outside any searched shard
+def fetch_chunk_embeddings(cursor, faiss_ids):
+    embeddings = {}
+    for start in range(0, len(faiss_ids), sql_batch_size):
+        batch = [int(i) for i in faiss_ids[start : start + sql_batch_size]]
+        cursor.execute(
+            f"""
+            SELECT faissId, embedding FROM chunks
+            WHERE faissId IN ({",".join("?" * len(batch))})
+            """,
+            batch,
+        )
+        embeddings.update(
+            (fid, decode_embedding(emb)) for fid, emb in cursor.fetchall() if emb
+        )
+    return embeddings
+
+
+# stored shingle hashes of chunks by faissId; chunks ingested before the column
+# existed are hashed from their text (neighbor_info, see fetch_chunk_metadata)
+def fetch_chunk_shingles(cursor, faiss_ids, neighbor_info):
+    shingles = {}
+    for start in range(0, len(faiss_ids), sql_batch_size):
+        batch = [int(i) for i in faiss_ids[start : start + sql_batch_size]]
+        cursor.execute(
+            f"""
+            SELECT faissId, shingles FROM chunks
+            WHERE faissId IN ({",".join("?" * len(batch))}) AND shingles IS NOT NULL
+            """,
+            batch,
+        )
+        shingles.update(
+            (fid, decode_shingles(blob)) for fid, blob in cursor.fetchall()
+        )
+    for faiss_id in faiss_ids:
+        faiss_id = int(faiss_id)
+        if faiss_id not in shingles and faiss_id in neighbor_info:
+            shingles[faiss_id] = shingle_hashes(neighbor_info[faiss_id][0])
+    return shingles
+
+
+# one database match as the report reads it. chunk is (faissId, text, ...),
+# neighbor is (text, materialId, courseId, ownerType) as in fetch_chunk_metadata,
+# scoring holds the weights and thresholds of the scan
+def database_match(
+    chunk_no,
+    chunk,
+    neighbor_id,
+    neighbor,
+    sem_sim,
+    ngram_sim,
+    exact_sim,
+    spans,
+    index_name,
+    scoring,
+):
+    faiss_id, chunk_text = chunk[:2]
+    n_text, n_material_id, n_course_id, n_owner_type = neighbor
+    final_score = (
+        scoring["semantic_weight"] * sem_sim + scoring["ngram_weight"] * ngram_sim
+    )
+    match_type = (
+        "MATCH"
+        if (
+            final_score >= scoring["semantic_threshold"]
+            or ngram_sim >= scoring["ngram_threshold"]
+        )
+        else "LOW_MATCH"
+    )
+    print(
+        f"[DB LOG] ChunkIndex: {chunk_no + 1}\n"
+        f"NeighborMaterialId: {n_material_id} | NeighborFaissId: {neighbor_id}\n"
+        f"Semantic={sem_sim:.3f} | Ngram={ngram_sim:.3f} | Final={final_score:.3f} | MatchType={match_type}\n"
+    )
+    return {
+        "chunkIndex": chunk_no + 1,
+        "chunkText": chunk_text,
+        "neighborText": n_text,
+        "neighborMaterialId": n_material_id,
+        "neighborCourseId": n_course_id,
+        "neighborOwnerType": n_owner_type,
+        "similarity": final_score,
+        "semantic_sim": sem_sim,
+        "ngram_sim": ngram_sim,
+        "exact_sim": exact_sim,
+        "matchedSpans": span_dicts(spans),
+        "chunkFaissId": faiss_id,
+        "neighborFaissId": neighbor_id,
+        "indexSource": index_name,
+        "sourceMaterialId": n_material_id,
+        "match_type": match_type,
+    }
+
+
+# database half of the scan: stack the chunk embeddings, search each shard once,
+# then score all (chunk, neighbor) pairs with one matrix product per shard.
+# course_id and scope select the corpus of the MinHash copy candidates;
+# chunk_shingles are the chunks' stored shingle hashes (None where missing).
+# Returns the matches and the mean match score of each chunk (0.0 without matches).
+def scan_database(
+    cursor,
+    material_id,
+    chunks,
+    shards,
+    course_id=None,
+    scope="course",
+    chunk_shingles=None,
+    top_k=5,
+    semantic_threshold=0.80,
+    ngram_threshold=0.3,
+    semantic_weight=0.7,
+    ngram_weight=0.3,
+):
+    matches = []
+    score_sums = np.zeros(len(chunks), dtype=np.float64)
+    score_counts = np.zeros(len(chunks), dtype=np.int64)
+
+    rows = [i for i, (_, _, emb) in enumerate(chunks) if emb]
+    if not rows:
+        return matches, score_sums.tolist()
+
+    # stored embeddings are already L2-normalized at ingest
+    chunk_ids = np.array(
+        [chunks[i][0] if chunks[i][0] is not None else -1 for i in rows],
+        dtype=np.int64,
+    )
+    chunk_embs = np.stack([decode_embedding(chunks[i][2]) for i in rows])
+
+    row_of = {chunk_no: r for r, chunk_no in enumerate(rows)}
+    neighbor_info = {}
+    neighbor_shingles = {}
+    seen_pairs = set()
+
+    if chunk_shingles is None:
+        chunk_shingles = [None] * len(chunks)
+    chunk_shingles = [
+        shingles if shingles is not None else shingle_hashes(chunk[1])
+        for chunk, shingles in zip(chunks, chunk_shingles)
+    ]
 
-    set1, set2 = ngrams(text1), ngrams(text2)
-    if not set1 or not set2:
-        return 0.0
-    return len(set1 & set2) / len(set1 | set2)
+    # Jaccard of every (chunk, neighbor) pair of a batch in one numpy pass
+    def pair_jaccards(chunk_nos, neighbor_ids):
+        missing = [n for n in set(neighbor_ids) if n not in neighbor_shingles]
+        neighbor_shingles.update(fetch_chunk_shingles(cursor, missing, neighbor_info))
+        empty = np.zeros(0, dtype=np.uint64)
+        return jaccard_pairs(
+            [chunk_shingles[c] for c in chunk_nos],
+            [neighbor_shingles.get(n, empty) for n in neighbor_ids],
+        )
+
+    scoring = {
+        "semantic_weight": semantic_weight,
+        "ngram_weight": ngram_weight,
+        "semantic_threshold": semantic_threshold,
+        "ngram_threshold": ngram_threshold,
+    }
+
+    def add_match(chunk_no, neighbor_id, sem_sim, ngram_sim, index_name):
+        seen_pairs.add((chunk_no, neighbor_id))
+        exact_sim, spans = align(chunks[chunk_no][1], neighbor_info[neighbor_id][0])
+        match = database_match(
+            chunk_no,
+            chunks[chunk_no],
+            neighbor_id,
+            neighbor_info[neighbor_id],
+            sem_sim,
+            ngram_sim,
+            exact_sim,
+            spans,
+            index_name,
+            scoring,
+        )
+        score_sums[chunk_no] += match["similarity"]
+        score_counts[chunk_no] += 1
+        matches.append(match)
+
+    for index_name, shard_course_id in shards:
+        vector_store = get_vector_store(index_name, shard_course_id)
+        # compressed indexes over-fetch; candidates are re-ranked exactly below
+        search_k = candidate_count(index_name, shard_course_id, top_k + 1)
+        D, I = search_index(index_name, shard_course_id, chunk_embs, search_k)
+
+        valid = (I >= 0) & (I != chunk_ids[:, None])
+        unique_ids = np.unique(I[valid])
+        neighbor_info.update(
+            fetch_chunk_metadata(
+                cursor, [n for n in unique_ids if int(n) not in neighbor_info]
+            )
+        )
+
+        keep = np.array(
+            [
+                int(n) in neighbor_info and neighbor_info[int(n)][1] != material_id
+                for n in unique_ids
+            ],
+            dtype=bool,
+        )
+        unique_ids = unique_ids[keep]
+        if len(unique_ids) == 0:
+            continue
+
+        neighbor_embs = gather_embeddings(vector_store, cursor, unique_ids)
+        sim_matrix = chunk_embs @ neighbor_embs.T
+
+        # map every (chunk, neighbor) hit onto its column in sim_matrix
+        pos = np.searchsorted(unique_ids, I)
+        pos = np.minimum(pos, len(unique_ids) - 1)
+        valid &= unique_ids[pos] == I
+        pair_sims = np.full(I.shape, -np.inf, dtype=np.float32)
+        pair_sims[valid] = sim_matrix[np.nonzero(valid)[0], pos[valid]]
+
+        # exact re-rank: keep the top_k + 1 best candidates of every chunk
+        if search_k > top_k + 1:
+            best = np.argsort(-pair_sims, axis=1)[:, : top_k + 1]
+            keep_best = np.zeros_like(valid)
+            np.put_along_axis(keep_best, best, True, axis=1)
+            valid &= keep_best
+
+        pair_rows, pair_cols = np.nonzero(valid)
+        sem_sims = pair_sims[pair_rows, pair_cols]
+        pair_chunks = [rows[r] for r in pair_rows]
+        pair_neighbors = [int(n) for n in I[pair_rows, pair_cols]]
+        ngram_sims = pair_jaccards(pair_chunks, pair_neighbors)
+        for chunk_no, neighbor_id, sem_sim, ngram_sim in zip(
+            pair_chunks, pair_neighbors, sem_sims, ngram_sims
+        ):
+            add_match(
+                chunk_no, neighbor_id, float(sem_sim), float(ngram_sim), index_name
+            )
+
+    # verbatim copies the embedding search ranked too low: chunks of other
+    # materials sharing a MinHash LSH band, checked the same way
+    signatures = {i: minhash_of(shingles) for i, shingles in enumerate(chunk_shingles)}
+    copy_candidates = find_copy_candidates(
+        cursor, signatures, material_id, course_id, scope
+    )
+    extra_pairs = [
+        (chunk_no, neighbor_id)
+        for chunk_no, neighbor_ids in copy_candidates.items()
+        for neighbor_id in neighbor_ids
+        if (chunk_no, neighbor_id) not in seen_pairs and chunks[chunk_no][2]
+    ]
+    if extra_pairs:
+        extra_ids = sorted({n for _, n in extra_pairs})
+        neighbor_info.update(
+            fetch_chunk_metadata(
+                cursor, [n for n in extra_ids if n not in neighbor_info]
+            )
+        )
+        extra_embs = fetch_chunk_embeddings(cursor, extra_ids)
+        extra_pairs = [
+            (chunk_no, neighbor_id)
+            for chunk_no, neighbor_id in extra_pairs
+            if neighbor_id in neighbor_info and neighbor_id in extra_embs
+        ]
+        ngram_sims = pair_jaccards(
+            [c for c, _ in extra_pairs], [n for _, n in extra_pairs]
+        )
+        for (chunk_no, neighbor_id), ngram_sim in zip(extra_pairs, ngram_sims):
+            sem_sim = float(chunk_embs[row_of[chunk_no]] @ extra_embs[neighbor_id])
+            add_match(chunk_no, neighbor_id, sem_sim, float(ngram_sim), "minhash")
+
+    chunk_scores = np.divide(
+        score_sums,
+        score_counts,
+        out=np.zeros_like(score_sums),
+        where=score_counts > 0,
+    )
+    return matches, chunk_scores.tolist()
+
+
+# database half of the scan from chunk_neighbors, rescored with the given weights,
+# without FAISS. A chunk keeps up to NEIGHBOR_KEEP rows, including reverse pairs
+# added by later materials, so it can list more matches than a live scan
+def lookup_database(
+    cursor,
+    material_id,
+    chunks,
+    course_id,
+    semantic_threshold=0.80,
+    ngram_threshold=0.3,
+    semantic_weight=0.7,
+    ngram_weight=0.3,
+):
+    scoring = {
+        "semantic_weight": semantic_weight,
+        "ngram_weight": ngram_weight,
+        "semantic_threshold": semantic_threshold,
+        "ngram_threshold": ngram_threshold,
+    }
+    chunk_no_of = {chunk[0]: i for i, chunk in enumerate(chunks)}
+    matches = []
+    score_sums = np.zeros(len(chunks), dtype=np.float64)
+    score_counts = np.zeros(len(chunks), dtype=np.int64)
+
+    for row in fetch_neighbors(cursor, material_id, course_id):
+        faiss_id, neighbor_id, sem_sim, ngram_sim, exact_sim, spans, source = row[:7]
+        chunk_no = chunk_no_of.get(faiss_id)
+        if chunk_no is None:
+            continue
+        match = database_match(
+            chunk_no,
+            chunks[chunk_no],
+            neighbor_id,
+            row[7:],
+            sem_sim,
+            ngram_sim,
+            exact_sim,
+            spans,
+            source,
+            scoring,
+        )
+        score_sums[chunk_no] += match["similarity"]
+        score_counts[chunk_no] += 1
+        matches.append(match)
+
+    chunk_scores = np.divide(
+        score_sums,
+        score_counts,
+        out=np.zeros_like(score_sums),
+        where=score_counts > 0,
+    )
+    return matches, chunk_scores.tolist()
+
+
+# course-scope database matches of a material, stored in both directions; run
+# by ingestion once the material is indexed
+def precompute_neighbors(material_id):
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT faissId, text, embedding, shingles FROM chunks WHERE materialId=?",
+            (material_id,),
+        )
+        rows = cursor.fetchall()
+        cursor.execute("SELECT courseId FROM materials WHERE id=?", (material_id,))
+        row = cursor.fetchone()
+        course_id = row[0] if row else None
+
+        matches, _ = scan_database(
+            cursor,
+            material_id,
+            [r[:3] for r in rows],
+            search_shards(course_id, "course"),
+            course_id=course_id,
+            scope="course",
+            chunk_shingles=[
+                decode_shingles(r[3]) if r[3] is not None else None for r in rows
+            ],
+            top_k=neighbor_top_k,
+        )
+        store_neighbors(cursor, material_id, matches)
+        conn.commit()
+        print(
+            f"[INFO] Stored {len(matches)} neighbor pairs of material {material_id}"
+        )
+        return len(matches)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
 
 # main plagiarism check function
@@ -182,6 +810,7 @@ def check_plagiarism_material(
     top_k=5,
     semantic_weight=0.7,
     ngram_weight=0.3,
+    scope="course",
 ):
     results = {"online": [], "database": []}
     total_sim_sum = 0.0
@@ -190,56 +819,96 @@ def check_plagiarism_material(
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     cursor.execute(
-        "SELECT faissId, text, embedding FROM chunks WHERE materialId=?", (material_id,)
+        """
+        SELECT faissId, text, embedding, queryEmbedding, shingles
+        FROM chunks WHERE materialId=?
+        """,
+        (material_id,),
     )
-    chunks = cursor.fetchall()
-
-    faiss_indexes = [
-        ("course", faiss_course_index),
-        ("submission", faiss_submission_index),
+    rows = cursor.fetchall()
+    chunks = [row[:3] for row in rows]
+    chunk_shingles = [
+        decode_shingles(row[4]) if row[4] is not None else shingle_hashes(row[1])
+        for row in rows
     ]
 
-    url_snippet_cache = {}
-    embedding_cache = {}
+    # search only the shards of the material's course unless scope is "global"
+    cursor.execute("SELECT courseId FROM materials WHERE id=?", (material_id,))
+    row = cursor.fetchone()
+    course_id = row[0] if row else None
+    shards = search_shards(course_id, scope)
+
     chunk_ngram_cache = {}
     seen_snippets_global = set()
 
-    for idx, (faiss_id, chunk_text, embedding_json) in enumerate(chunks, 1):
+    # keywords of every chunk first, then all searches and page fetches of the
+    # scan run concurrently on the fetch engine
+    queries = chunk_queries(rows, top_n=20)
+
+    # one search per cluster of near-duplicate queries, its urls shared by
+    # every chunk of the cluster
+    searches, assignment = cluster_queries(queries, num_results)
+    if len(searches) < len(queries):
+        print(
+            f"[INFO] {len(queries)} chunk queries planned as {len(searches)} searches"
+        )
+    try:
+        urls_per_search, url_snippets = fetch_engine.run(
+            fetch_engine.gather_online(
+                [q for q, _ in searches],
+                num_results=[n for _, n in searches],
+            )
+        )
+        urls_per_chunk = [urls_per_search[i] for i in assignment]
+    except Exception as e:
+        print(f"[ERROR online] {e}")
+        urls_per_chunk, url_snippets = [[] for _ in rows], {}
+
+    for idx, (row, shingles, urls) in enumerate(
+        zip(rows, chunk_shingles, urls_per_chunk), 1
+    ):
+        faiss_id, chunk_text, embedding_blob, query_blob = row[:4]
         total_chunks += 1
         print(f"\n[SCAN] Chunk {idx}/{len(chunks)}")
         print(f"[CHUNK TEXT] {chunk_text[:200]}{'...' if len(chunk_text)>200 else ''}")
 
         try:
-            keywords = extract_keywords(chunk_text, top_n=20)
-            query = " ".join(keywords) if keywords else chunk_text[:200]
-            urls = ddg_lite_search(query, num_results=num_results)
-
             if chunk_text not in chunk_ngram_cache:
                 chunk_ngram_cache[chunk_text] = chunk_text
 
+            # the query side is read from the chunk row or encoded once per chunk
+            emb_query = (
+                chunk_query_embedding(chunk_text, embedding_blob, query_blob)
+                if urls
+                else None
+            )
+
             # process URL
             def process_url(url):
                 try:
-                    snippets = url_snippet_cache.get(url)
-                    if snippets is None:
-                        snippets = fetch_web_snippet(url)
-                        url_snippet_cache[url] = snippets
+                    snippets = url_snippets.get(url, [])
+                    snippets = [s for s in snippets if s not in seen_snippets_global]
 
                     url_matches = []
-                    for snippet in snippets:
+                    for (
+                        snippet,
+                        sem_sim,
+                        ngram_sim,
+                        final_score,
+                        exact_sim,
+                        spans,
+                    ) in score_snippets(
+                        chunk_text,
+                        emb_query,
+                        snippets,
+                        chunk_shingles=shingles,
+                        semantic_weight=semantic_weight,
+                        ngram_weight=ngram_weight,
+                        ngram_threshold=ngram_threshold,
+                    ):
                         if snippet in seen_snippets_global:
                             continue
 
-                        sem_sim = semantic_similarity_batch(
-                            chunk_text, [snippet], model
-                        )
-                        sem_sim = sem_sim[0] if sem_sim else 0.0
-                        ngram_sim = jaccard_similarity(chunk_text, snippet, n=5)
-                        final_score = (
-                            semantic_weight * sem_sim + ngram_weight * ngram_sim
-                        )
-                        exact_sim = substring_similarity(chunk_text, snippet)
-
                         match_type = None
                         if exact_sim >= exact_threshold or ngram_sim >= ngram_threshold:
                             match_type = "EXACT COPY"
@@ -261,6 +930,7 @@ def check_plagiarism_material(
                                 "chunkText": chunk_text,
                                 "snippetText": snippet,
                                 "exact_sim": exact_sim,
+                                "matchedSpans": span_dicts(spans),
                                 "semantic_sim": sem_sim,
                                 "ngram_sim": ngram_sim,
                                 "final_score": final_score,
@@ -275,109 +945,52 @@ def check_plagiarism_material(
                     print(f"[ERROR] process_url {url}: {e}")
                     return []
 
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                futures = {executor.submit(process_url, u): u for u in urls}
-                for future in as_completed(futures):
-                    url_matches = future.result()
-                    results["online"].extend(url_matches)
+            for url in urls:
+                results["online"].extend(process_url(url))
 
         except Exception as e:
             print(f"[ERROR online] {e}")
 
-        # database check
-        try:
-            if not embedding_json:
-                continue
-
-            chunk_emb = embedding_cache.get(embedding_json)
-            if chunk_emb is None:
-                chunk_emb = np.array(json.loads(embedding_json), dtype=np.float32)
-                chunk_emb /= np.linalg.norm(chunk_emb)
-                embedding_cache[embedding_json] = chunk_emb
-
-            per_chunk_sims = []
-
-            for index_name, faiss_index in faiss_indexes:
-                if faiss_index is None:
-                    continue
-
-                D, I = faiss_index.search(chunk_emb.reshape(1, -1), k=top_k + 1)
-                neighbor_embs = []
-                neighbor_rows = []
-
-                for distance, neighbor_id in zip(D[0], I[0]):
-                    if neighbor_id == faiss_id or neighbor_id < 0:
-                        continue
-                    cursor.execute(
-                        "SELECT text, embedding, materialId FROM chunks WHERE faissId=?",
-                        (int(neighbor_id),),
-                    )
-                    row = cursor.fetchone()
-                    if not row:
-                        continue
-                    n_text, n_emb_json, n_material_id = row
-                    if n_material_id == material_id:
-                        continue
-                    neighbor_rows.append(
-                        (neighbor_id, n_text, n_emb_json, n_material_id)
-                    )
-                    if n_emb_json in embedding_cache:
-                        neighbor_embs.append(embedding_cache[n_emb_json])
-                    else:
-                        emb = np.array(json.loads(n_emb_json), dtype=np.float32)
-                        emb /= np.linalg.norm(emb)
-                        embedding_cache[n_emb_json] = emb
-                        neighbor_embs.append(emb)
-
-                if neighbor_embs:
-                    neighbor_embs = np.stack(neighbor_embs)
-                    sims = np.dot(neighbor_embs, chunk_emb)
-                    for (
-                        neighbor_id,
-                        n_text,
-                        n_emb_json,
-                        n_material_id,
-                    ), sem_sim in zip(neighbor_rows, sims):
-                        ngram_sim = jaccard_similarity(chunk_text, n_text, n=5)
-                        final_score = (
-                            semantic_weight * sem_sim + ngram_weight * ngram_sim
-                        )
-
-                        match_type = (
-                            "MATCH"
-                            if (
-                                final_score >= semantic_threshold
-                                or ngram_sim >= ngram_threshold
-                            )
-                            else "LOW_MATCH"
-                        )
-                        print(
-                            f"[DB LOG] ChunkIndex: {idx}\n"
-                            # f"ChunkText: {chunk_text[:200]}...\n"
-                            f"NeighborMaterialId: {n_material_id} | NeighborFaissId: {neighbor_id}\n"
-                            # f"NeighborText: {n_text[:200]}...\n"
-                            f"Semantic={sem_sim:.3f} | Ngram={ngram_sim:.3f} | Final={final_score:.3f} | MatchType={match_type}\n"
-                        )
-                        per_chunk_sims.append(final_score)
-                        results["database"].append(
-                            {
-                                "chunkIndex": idx,
-                                "chunkText": chunk_text,
-                                "neighborText": n_text,
-                                "neighborMaterialId": n_material_id,
-                                "similarity": final_score,
-                                "chunkFaissId": faiss_id,
-                                "neighborFaissId": neighbor_id,
-                                "indexSource": index_name,
-                                "sourceMaterialId": n_material_id,
-                                "match_type": match_type,
-                            }
-                        )
-
-            total_sim_sum += np.mean(per_chunk_sims) if per_chunk_sims else 0.0
-
-        except Exception as e:
-            print(f"[ERROR db] {e}")
+    # database check: a read of the precomputed neighbors for the course scope,
+    # otherwise every chunk of the material in one batched search per shard
+    try:
+        precomputed = (
+            scope == "course" and PRECOMPUTE_NEIGHBORS and top_k == neighbor_top_k
+        )
+        if precomputed and neighbors_ready(cursor, material_id):
+            db_matches, chunk_scores = lookup_database(
+                cursor,
+                material_id,
+                chunks,
+                course_id,
+                semantic_threshold=semantic_threshold,
+                ngram_threshold=ngram_threshold,
+                semantic_weight=semantic_weight,
+                ngram_weight=ngram_weight,
+            )
+        else:
+            db_matches, chunk_scores = scan_database(
+                cursor,
+                material_id,
+                chunks,
+                shards,
+                course_id=course_id,
+                scope=scope,
+                chunk_shingles=chunk_shingles,
+                top_k=top_k,
+                semantic_threshold=semantic_threshold,
+                ngram_threshold=ngram_threshold,
+                semantic_weight=semantic_weight,
+                ngram_weight=ngram_weight,
+            )
+            # materials indexed before the table existed are filled on first scan
+            if precomputed:
+                store_neighbors(cursor, material_id, db_matches)
+                conn.commit()
+        results["database"].extend(db_matches)
+        total_sim_sum = float(sum(chunk_scores))
+    except Exception as e:
+        print(f"[ERROR db] {e}")
 
     conn.close()
 
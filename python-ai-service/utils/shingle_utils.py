@@ -0,0 +1,67 @@
+import hashlib
+import numpy as np
+from utils.text_utils import normalized_words
+
+# word n-gram shingles of normalize_text, hashed to sorted unique uint64 arrays.
+# Chunks store theirs at ingest (chunks.shingles); MinHash signatures are built
+# from the same hashes, so every Jaccard in the service sees the same shingles
+shingle_size = 5
+
+
+def shingle_hashes(text, n=shingle_size):
+    words = normalized_words(text)
+    return np.unique(
+        np.array(
+            [
+                int.from_bytes(
+                    hashlib.blake2b(
+                        " ".join(words[i : i + n]).encode("utf-8"), digest_size=8
+                    ).digest(),
+                    "little",
+                )
+                for i in range(len(words) - n + 1)
+            ],
+            dtype=np.uint64,
+        )
+    )
+
+
+def encode_shingles(hashes):
+    return hashes.astype(np.uint64).tobytes()
+
+
+def decode_shingles(blob):
+    return np.frombuffer(blob, dtype=np.uint64)
+
+
+# Jaccard of many (left, right) pairs of hash arrays in one pass: both sides are
+# concatenated, sorted by (pair, hash), and equal neighbours are the intersection
+def jaccard_pairs(lefts, rights):
+    if not len(lefts):
+        return np.zeros(0, dtype=np.float64)
+    left_sizes = np.array([len(a) for a in lefts], dtype=np.int64)
+    right_sizes = np.array([len(b) for b in rights], dtype=np.int64)
+    pair_ids = np.arange(len(lefts))
+    hashes = np.concatenate(
+        [np.zeros(0, dtype=np.uint64)] + list(lefts) + list(rights)
+    ).astype(np.uint64)
+    owners = np.concatenate(
+        [np.repeat(pair_ids, left_sizes), np.repeat(pair_ids, right_sizes)]
+    )
+
+    order = np.lexsort((hashes, owners))
+    hashes, owners = hashes[order], owners[order]
+    same = (hashes[1:] == hashes[:-1]) & (owners[1:] == owners[:-1])
+    intersections = np.bincount(owners[1:][same], minlength=len(lefts))
+
+    unions = left_sizes + right_sizes - intersections
+    return np.divide(
+        intersections,
+        unions,
+        out=np.zeros(len(lefts), dtype=np.float64),
+        where=(left_sizes > 0) & (right_sizes > 0),
+    )
+
+
+def jaccard(left, right):
+    return float(jaccard_pairs([left], [right])[0])
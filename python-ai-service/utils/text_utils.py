@@ -1,16 +1,32 @@
-import pdfplumber
-import docx
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+import re
+
+# parser and splitter libraries are imported on first use, they are slow to load
+
+punctuation = re.compile(r"[^\w\s]", flags=re.UNICODE)
+
+
+# the one normalization every text comparison uses: lowercase, punctuation
+# dropped, whitespace collapsed
+def normalize_text(text):
+    return " ".join(punctuation.sub("", (text or "").lower()).split())
+
+
+def normalized_words(text):
+    return normalize_text(text).split()
 
 
 def extract_text(file_path):
     if file_path.endswith(".pdf"):
+        import pdfplumber
+
         text = ""
         with pdfplumber.open(file_path) as pdf:
             for page in pdf.pages:
                 text += page.extract_text() or ""
         return text
     elif file_path.endswith(".docx"):
+        import docx
+
         doc = docx.Document(file_path)
         return "\n".join([p.text for p in doc.paragraphs])
     else:
@@ -19,6 +35,8 @@ def extract_text(file_path):
 
 # Recursive Character Splitter
 def recursive_chunk(text, chunk_size=500, chunk_overlap=50):
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
@@ -0,0 +1,185 @@
+import os
+import threading
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process file locking only
+    fcntl = None
+
+
+# Append-only, memory-mapped float32 matrix of chunk embeddings keyed by faissId.
+#   <prefix>.vectors  raw float32 rows (dimension values each)
+#   <prefix>.ids      raw int64 faissId per row, -1 marks a deleted row
+# Every process maps the same files, so the rows are shared through the page cache.
+# Readers remap whenever the files change on disk (append, delete or compaction).
+class VectorStore:
+    def __init__(self, prefix, dimension):
+        self.vectors_file = prefix + ".vectors"
+        self.ids_file = prefix + ".ids"
+        self.lock_file = prefix + ".lock"
+        self.dimension = dimension
+        self._lock = threading.RLock()
+        self._signature = None
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._order = np.empty(0, dtype=np.int64)
+        self._sorted_ids = np.empty(0, dtype=np.int64)
+
+    # cross-process writer lock
+    def _file_lock(self):
+        handle = open(self.lock_file, "a")
+        if fcntl:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _file_unlock(self, handle):
+        if fcntl:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+        handle.close()
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.ids_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _refresh(self):
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return
+        self._signature = signature
+
+        rows = signature[1] // 8 if signature else 0
+        if rows == 0:
+            self._vectors = np.empty((0, self.dimension), dtype=np.float32)
+            self._ids = np.empty(0, dtype=np.int64)
+        else:
+            self._ids = np.array(
+                np.memmap(self.ids_file, dtype=np.int64, mode="r", shape=(rows,))
+            )
+            self._vectors = np.memmap(
+                self.vectors_file,
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, self.dimension),
+            )
+        self._order = np.argsort(self._ids, kind="stable")
+        self._sorted_ids = self._ids[self._order]
+
+    def _rows_for(self, ids):
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self._sorted_ids) == 0:
+            return np.full(len(ids), -1, dtype=np.int64), np.zeros(len(ids), bool)
+        pos = np.searchsorted(self._sorted_ids, ids)
+        pos = np.minimum(pos, len(self._sorted_ids) - 1)
+        found = (self._sorted_ids[pos] == ids) & (ids >= 0)
+        rows = np.where(found, self._order[pos], -1)
+        return rows, found
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return int(np.count_nonzero(self._ids >= 0))
+
+    # append rows; vectors are written before ids so a reader never sees an id
+    # whose vector is not on disk yet
+    def add(self, ids, vectors):
+        ids = np.ascontiguousarray(ids, dtype=np.int64)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(ids) == 0:
+            return
+        with self._lock:
+            handle = self._file_lock()
+            try:
+                rows = (self._stat_signature() or (0, 0, 0))[1] // 8
+                with open(self.vectors_file, "ab") as f:
+                    # drop a torn tail left by a writer that died mid-append
+                    f.truncate(rows * self.dimension * 4)
+                    f.write(vectors.tobytes())
+                with open(self.ids_file, "ab") as f:
+                    f.write(ids.tobytes())
+            finally:
+                self._file_unlock(handle)
+
+    def remove(self, ids):
+        with self._lock:
+            handle = self._file_lock()
+            try:
+                self._signature = None
+                self._refresh()
+                rows, found = self._rows_for(ids)
+                rows = rows[found]
+                if len(rows):
+                    mm = np.memmap(
+                        self.ids_file,
+                        dtype=np.int64,
+                        mode="r+",
+                        shape=(len(self._ids),),
+                    )
+                    mm[rows] = -1
+                    mm.flush()
+                    del mm
+                    os.utime(self.ids_file)
+                removed = len(rows)
+            finally:
+                self._file_unlock(handle)
+
+        if removed and self.deleted_ratio() > 0.5:
+            self.compact()
+        return removed
+
+    def reset(self):
+        with self._lock:
+            handle = self._file_lock()
+            try:
+                for path in (self.vectors_file, self.ids_file):
+                    open(path, "wb").close()
+            finally:
+                self._file_unlock(handle)
+
+    def deleted_ratio(self):
+        with self._lock:
+            self._refresh()
+            if len(self._ids) == 0:
+                return 0.0
+            return float(np.count_nonzero(self._ids < 0)) / len(self._ids)
+
+    # rewrite the files without deleted rows; readers remap on the new inode
+    def compact(self):
+        with self._lock:
+            handle = self._file_lock()
+            try:
+                self._signature = None
+                self._refresh()
+                keep = self._ids >= 0
+                for path, data in (
+                    (self.vectors_file, self._vectors[keep]),
+                    (self.ids_file, self._ids[keep]),
+                ):
+                    tmp_path = path + ".tmp"
+                    with open(tmp_path, "wb") as f:
+                        f.write(np.ascontiguousarray(data).tobytes())
+                    os.replace(tmp_path, path)
+                self._signature = None
+            finally:
+                self._file_unlock(handle)
+
+    # every live (ids, vectors) pair, copied into memory (used to rebuild indexes)
+    def all(self):
+        with self._lock:
+            self._refresh()
+            keep = self._ids >= 0
+            return self._ids[keep], np.array(self._vectors[keep], dtype=np.float32)
+
+    # gather the vectors of many ids in one fancy-indexing call;
+    # returns (vectors, found) where rows of missing ids are zero
+    def get(self, ids):
+        with self._lock:
+            self._refresh()
+            rows, found = self._rows_for(ids)
+            vectors = np.zeros((len(rows), self.dimension), dtype=np.float32)
+            if found.any():
+                vectors[found] = self._vectors[rows[found]]
+            return vectors, found
@@ -0,0 +1,70 @@
+import os
+import time
+import sqlite3
+import threading
+from config.database import DB_PATH
+from models.embedding import model_loaded
+from utils.embedding_batcher import embed_texts
+from utils.plagiarism_utils import get_kw_model, kw_model_loaded
+from utils.faiss_utils import index_kinds, shard_exists, get_shard
+
+# load the models in the background as soon as the server starts
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "1") == "1"
+
+warmup_lock = threading.Lock()
+warmup_state = {"status": "idle", "error": None, "seconds": None}
+
+
+# load the embedding model and keyword extractor and run them once, plus the
+# shards of the given courses
+def warm_up(course_ids=None):
+    with warmup_lock:
+        started = time.time()
+        warmup_state.update(status="running", error=None)
+        try:
+            # the first call also builds the tokenizer and compute kernels
+            embed_texts(["passage: warm up"])
+            get_kw_model().extract_keywords("warm up")
+            for course_id in course_ids or []:
+                for kind in index_kinds:
+                    if shard_exists(kind, course_id):
+                        get_shard(kind, course_id)
+        except Exception as e:
+            warmup_state.update(status="error", error=str(e))
+            raise
+
+        warmup_state.update(status="done", seconds=round(time.time() - started, 2))
+        print(f"[INFO] Warm-up finished in {warmup_state['seconds']}s")
+        return dict(warmup_state)
+
+
+def start_warmup():
+    def run():
+        try:
+            warm_up()
+        except Exception as e:
+            print(f"[ERROR] warm-up: {e}")
+
+    threading.Thread(target=run, name="warmup", daemon=True).start()
+
+
+def database_ok():
+    try:
+        conn = sqlite3.connect(DB_PATH, timeout=2)
+        try:
+            conn.execute("SELECT 1 FROM materials LIMIT 1")
+        finally:
+            conn.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+# what /ready waits for before the service takes plagiarism and ingest traffic
+def readiness():
+    checks = {
+        "database": database_ok(),
+        "embeddingModel": model_loaded(),
+        "keywordModel": kw_model_loaded(),
+    }
+    return all(checks.values()), checks
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from utils.memory_cache import LRUCache
+
+# search results and extracted page snippets, kept across scans and restarts in
+# a separate SQLite file so cache writes never contend with database.db
+WEB_CACHE_PATH = os.getenv(
+    "WEB_CACHE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "web_cache.db"),
+)
+# seconds before an entry is fetched again; search rankings move faster than pages
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600)))
+SNIPPET_CACHE_TTL = int(os.getenv("SNIPPET_CACHE_TTL", str(7 * 24 * 3600)))
+# least recently used entries are dropped above this size
+WEB_CACHE_MAX_MB = float(os.getenv("WEB_CACHE_MAX_MB", "256"))
+# hot snippets are also kept in memory, in front of the SQLite file
+SNIPPET_MEMORY_CACHE_MB = float(os.getenv("SNIPPET_MEMORY_CACHE_MB", "32"))
+snippet_memory_cache = LRUCache("webSnippets", SNIPPET_MEMORY_CACHE_MB)
+# expiry and the size bound are checked every this many writes
+evict_every = 100
+# snippets served from memory refresh their SQLite lastUsed at most this often
+# (seconds), so the size bound does not evict the hottest entries first
+touch_every = 300
+
+ttls = {"search": SEARCH_CACHE_TTL, "snippets": SNIPPET_CACHE_TTL}
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_writes = 0
+stats = {"searchHits": 0, "searchMisses": 0, "snippetHits": 0, "snippetMisses": 0}
+
+
+# one connection per thread; the fetch engine calls in from executor threads
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(WEB_CACHE_PATH, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS web_cache (
+                kind TEXT NOT NULL CHECK(kind IN ('search','snippets')),
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                createdAt REAL NOT NULL,
+                lastUsed REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_web_cache_lastUsed ON web_cache(lastUsed)"
+        )
+        _local.conn = conn
+    return conn
+
+
+def _count(name):
+    with _stats_lock:
+        stats[name] += 1
+
+
+# (value, createdAt), or None on a miss
+def _get(kind, key):
+    conn = _connect()
+    now = time.time()
+    row = conn.execute(
+        "SELECT value, createdAt FROM web_cache WHERE kind = ? AND key = ?",
+        (kind, key),
+    ).fetchone()
+    if row is None or row[1] < now - ttls[kind]:
+        return None
+    conn.execute(
+        "UPDATE web_cache SET lastUsed = ? WHERE kind = ? AND key = ?",
+        (now, kind, key),
+    )
+    return json.loads(row[0]), row[1]
+
+
+def _touch(kind, key, now):
+    _connect().execute(
+        "UPDATE web_cache SET lastUsed = ? WHERE kind = ? AND key = ?",
+        (now, kind, key),
+    )
+
+
+def _put(kind, key, value):
+    global _writes
+    data = json.dumps(value, ensure_ascii=False)
+    now = time.time()
+    _connect().execute(
+        """
+        INSERT OR REPLACE INTO web_cache (kind, key, value, size, createdAt, lastUsed)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (kind, key, data, len(key) + len(data.encode("utf-8")), now, now),
+    )
+    with _stats_lock:
+        _writes += 1
+        due = _writes % evict_every == 0
+    if due:
+        evict()
+
+
+# drop expired entries, then the least recently used ones until the cache is back
+# under 90% of WEB_CACHE_MAX_MB
+def evict():
+    conn = _connect()
+    now = time.time()
+    conn.execute(
+        """
+        DELETE FROM web_cache
+        WHERE (kind = 'search' AND createdAt < ?)
+           OR (kind = 'snippets' AND createdAt < ?)
+        """,
+        (now - SEARCH_CACHE_TTL, now - SNIPPET_CACHE_TTL),
+    )
+
+    max_bytes = WEB_CACHE_MAX_MB * 1024 * 1024
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM web_cache").fetchone()[0]
+    if total <= max_bytes:
+        return 0
+
+    victims = []
+    for kind, key, size in conn.execute(
+        "SELECT kind, key, size FROM web_cache ORDER BY lastUsed"
+    ):
+        if total <= max_bytes * 0.9:
+            break
+        victims.append((kind, key))
+        total -= size
+    conn.executemany("DELETE FROM web_cache WHERE kind = ? AND key = ?", victims)
+    print(f"[INFO] Web cache evicted {len(victims)} entries")
+    return len(victims)
+
+
+# the cache is best effort: a failing cache file means fetching from the network
+def _safe_get(kind, key):
+    try:
+        return _get(kind, key)
+    except sqlite3.Error as e:
+        print(f"[WARN] web cache read failed: {e}")
+        return None
+
+
+def _safe_touch(kind, key, now):
+    try:
+        _touch(kind, key, now)
+    except sqlite3.Error as e:
+        print(f"[WARN] web cache write failed: {e}")
+
+
+def _safe_put(kind, key, value):
+    try:
+        _put(kind, key, value)
+    except sqlite3.Error as e:
+        print(f"[WARN] web cache write failed: {e}")
+
+
+# urls for a query, or None on a miss
+def get_search(query, num_results):
+    found = _safe_get("search", f"{num_results}\n{query}")
+    _count("searchHits" if found is not None else "searchMisses")
+    return found[0] if found is not None else None
+
+
+def put_search(query, num_results, urls):
+    _safe_put("search", f"{num_results}\n{query}", urls)
+
+
+# extracted snippet chunks of a page, or None on a miss. Memory entries are
+# [createdAt, snippets, lastTouched]; createdAt is the SQLite one, so promoted
+# entries still expire SNIPPET_CACHE_TTL after they were fetched
+def get_snippets(url):
+    now = time.time()
+    entry = snippet_memory_cache.get(url)
+    if entry is not None and entry[0] >= now - SNIPPET_CACHE_TTL:
+        snippets = entry[1]
+        if entry[2] < now - touch_every:
+            entry[2] = now
+            _safe_touch("snippets", url, now)
+    else:
+        snippets = None
+        found = _safe_get("snippets", url)
+        if found is not None:
+            snippets, created_at = found
+            snippet_memory_cache.put(url, [created_at, snippets, now])
+    _count("snippetHits" if snippets is not None else "snippetMisses")
+    return snippets
+
+
+def put_snippets(url, snippets):
+    now = time.time()
+    snippet_memory_cache.put(url, [now, snippets, now])
+    _safe_put("snippets", url, snippets)
+
+
+def cache_stats():
+    with _stats_lock:
+        result = dict(stats)
+    for kind in ("search", "snippet"):
+        lookups = result[f"{kind}Hits"] + result[f"{kind}Misses"]
+        result[f"{kind}HitRate"] = (
+            round(result[f"{kind}Hits"] / lookups, 3) if lookups else None
+        )
+    return result
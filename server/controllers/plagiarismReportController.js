@@ -19,6 +19,18 @@ export const checkPlagiarismController = async (req, res) => {
     );
 
     const data = flaskResponse.data;
+    // files are still being ingested; the caller should retry later
+    if (flaskResponse.status === 202 || data.status === "processing") {
+      return res.status(202).json({
+        success: false,
+        status: "processing",
+        message: data.message || "Submission is still being processed",
+        total: data.total,
+        pending: data.pending,
+        materials: data.materials,
+      });
+    }
+
     if (!data.success) {
       return res.status(500).json({
         success: false,